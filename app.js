@@ -68,6 +68,9 @@ const pulseBody = document.getElementById('pulse-body');
 let lastFocusedElement = null;
 let currentBriefCarId = null;
 let pendingBriefCarId = null;
+let allCarsReady = Promise.resolve();  // settles once every data chunk is loaded
+let facets = null;  // facets.json from the scraper (facets.py); null means scan allCars
+let changeFeed = null;  // changes.json: new/removed/repriced since the previous crawl (snapshot_diff.py)
 let briefCopyState = { carId: null, negotiationText: '', questionsText: '' };
 
 // Toast Notification System
@@ -206,6 +209,8 @@ function refreshPulseFromData() {
 
     const priceDrops = [];
     const priceIncreases = [];
+    // Prices from the previous crawl, for cars this browser has not seen priced before
+    const crawlPrices = new Map((changeFeed?.repriced || []).map(([id, from]) => [String(id), from]));
 
     for (const id of trackedIds) {
         const car = allCars.find(c => String(c.id) === String(id));
@@ -218,7 +223,7 @@ function refreshPulseFromData() {
         const storedPrevious = lastPrices?.[id] != null ? Number(lastPrices[id]) : null;
         const previousPrice = (historyPeak != null && historyPeak > currentPrice)
             ? historyPeak
-            : (storedPrevious != null && !Number.isNaN(storedPrevious) && storedPrevious > 0 ? storedPrevious : null);
+            : (storedPrevious != null && !Number.isNaN(storedPrevious) && storedPrevious > 0 ? storedPrevious : (crawlPrices.get(id) ?? null));
 
         if (previousPrice != null && previousPrice !== currentPrice) {
             const delta = previousPrice - currentPrice;
@@ -232,8 +237,9 @@ function refreshPulseFromData() {
         lastPrices[id] = currentPrice;
     }
 
+    const ts = (changeFeed?.generatedAt || 0) * 1000;
     pulseState = {
-        newListings: [],
+        newListings: (changeFeed?.new || []).slice(0, 50).map(id => ({ id: String(id), ts })),
         priceDrops: priceDrops.sort((a, b) => b.delta - a.delta).slice(0, 20),
         priceIncreases: priceIncreases.sort((a, b) => b.delta - a.delta).slice(0, 20),
         ts: Date.now()
@@ -257,6 +263,7 @@ async function init() {
     syncPersonaUI();
     updateSavedCount();
     updateCompareCount();
+    await allCarsReady;
     refreshPulseFromData();
     if (pendingBriefCarId) {
         const id = pendingBriefCarId;
@@ -701,15 +708,36 @@ function setupInfiniteScroll() {
     }
 }
 
+async function fetchJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to load ${url}`);
+    return response.json();
+}
+
 async function loadCars() {
     try {
         if (loading) loading.style.display = 'block';
-        const response = await fetch('cars.json');
-        if (!response.ok) throw new Error('Failed to load cars');
-        const rawData = await response.json();
+        // data/manifest.json is written by `--chunked` exports (site_chunks.py): render the first
+        // chunk right away and fetch the rest in the background
+        const [manifest, facetIndex, changes] = await Promise.all([
+            fetchJson('data/manifest.json').catch(() => null),
+            fetchJson('facets.json').catch(() => null),
+            fetchJson('changes.json').catch(() => null)
+        ]);
+        changeFeed = changes;
+        let rawData;
+        if (manifest?.chunks?.length) {
+            rawData = await fetchJson(manifest.chunks[0]);
+        } else {
+            // cars.min.json is pre-normalized by the scraper (normalize.py); cars.json is the raw crawl output
+            rawData = await fetchJson('cars.min.json').catch(() => fetchJson('cars.json'));
+        }
 
         allCars = rawData.map((car, i) => normalizeCar(car, i));
         filteredCars = [...allCars];
+        // Only trust the facets if they describe the data that was loaded
+        const expectedTotal = manifest?.chunks?.length ? manifest.total : allCars.length;
+        facets = facetIndex?.total === expectedTotal ? facetIndex : null;
 
         populateFilters();
         updateStats();
@@ -718,6 +746,10 @@ async function loadCars() {
         if (loading) loading.style.display = 'none';
         updateSavedCount();
         updateCompareCount();
+
+        if (manifest?.chunks?.length > 1) {
+            allCarsReady = loadRemainingChunks(manifest.chunks.slice(1));
+        }
     } catch (error) {
         console.error('Error loading cars:', error);
         if (loading) {
@@ -726,6 +758,39 @@ async function loadCars() {
     }
 }
 
+function hasActiveFilters() {
+    const activeTag = document.querySelector('.filter-tag.active')?.dataset.filter || 'all';
+    return Boolean(filterMake.value || filterModel.value || filterYear.value || filterPrice.value ||
+        filterBody.value || searchInput.value.trim() || sortSelect.value) ||
+        activeTag !== 'all' || currentPersona !== 'all';
+}
+
+async function loadRemainingChunks(chunkUrls) {
+    try {
+        const chunks = await Promise.all(chunkUrls.map(fetchJson));
+        const loaded = allCars.length;
+        allCars = allCars.concat(chunks.flat().map((car, i) => normalizeCar(car, loaded + i)));
+
+        const make = filterMake.value;
+        const year = filterYear.value;
+        populateFilters();
+        filterMake.value = make;
+        filterYear.value = year;
+        updateStats();
+
+        if (hasActiveFilters()) {
+            applyFilters();
+        } else {
+            // Chunks come in the default order, so the unfiltered list just grows; keep the scroll position
+            filteredCars = [...allCars];
+            if (totalCount) totalCount.textContent = filteredCars.length.toLocaleString();
+            if (scrollLoader) scrollLoader.style.display = displayedCount < filteredCars.length ? 'flex' : 'none';
+        }
+    } catch (error) {
+        console.error('Error loading remaining cars:', error);
+    }
+}
+
 function normalizeCar(raw, index) {
     const isCarGurus = raw.listingTitle || raw.makeName;
 
@@ -744,6 +809,7 @@ function normalizeCar(raw, index) {
             fuelType: raw.localizedFuelType || 'Gasoline',
             drivetrain: raw.localizedDriveTrain || raw.driveTrain || 'FWD',
             bodyType: raw.bodyTypeName || 'Sedan',
+            engine: raw.localizedEngineDisplayName || '',
             imageUrl: raw.originalPictureData?.url || 'https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=800',
             dealRating: formatDealRating(raw.dealRating),
             dealScore: raw.dealScore || 0,
@@ -793,10 +859,11 @@ function formatCurrencyWhole(amount) {
 }
 
 function populateFilters() {
-    const makes = [...new Set(allCars.map(c => c.make))].sort();
+    const makes = facets ? Object.keys(facets.makes).sort() : [...new Set(allCars.map(c => c.make))].sort();
     filterMake.innerHTML = '<option value="">All Makes</option>' + makes.map(m => `<option value="${m}">${m}</option>`).join('');
 
-    const years = [...new Set(allCars.map(c => c.year))].sort((a, b) => b - a);
+    const years = (facets ? Object.keys(facets.years).map(Number) : [...new Set(allCars.map(c => c.year))])
+        .sort((a, b) => b - a);
     filterYear.innerHTML = '<option value="">All Years</option>' + years.map(y => `<option value="${y}">${y}</option>`).join('');
 }
 
@@ -806,13 +873,15 @@ function populateModels() {
         filterModel.innerHTML = '<option value="">All Models</option>';
         return;
     }
-    const models = [...new Set(allCars.filter(c => c.make === selectedMake).map(c => c.model))].sort();
+    const models = facets
+        ? Object.keys(facets.models[selectedMake] || {}).sort()
+        : [...new Set(allCars.filter(c => c.make === selectedMake).map(c => c.model))].sort();
     filterModel.innerHTML = '<option value="">All Models</option>' + models.map(m => `<option value="${m}">${m}</option>`).join('');
 }
 
 function updateStats() {
     if (totalCarsEl) {
-        totalCarsEl.textContent = allCars.length.toLocaleString();
+        totalCarsEl.textContent = (facets ? facets.total : allCars.length).toLocaleString();
     }
 }
 
@@ -2002,7 +2071,7 @@ function openPulse() {
         const img = escapeHtml(car.imageUrl || 'https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=800');
         const miles = Math.round(Number(car.mileage || 0) / 1000);
         const meta = escapeHtml(`${Number.isFinite(miles) ? `${miles}k miles` : '--'} • ${money(Number(car.price || 0))}`);
-        const delta = money(Math.round(Number(evt.delta || 0)));
+        const delta = evt.delta ? ` ${money(Math.round(Number(evt.delta)))}` : '';
         return `
           <div class="saved-row">
             <div class="saved-thumb"><img src="${img}" alt="${title}" loading="lazy" referrerpolicy="no-referrer" crossorigin="anonymous"></div>
@@ -2010,7 +2079,7 @@ function openPulse() {
               <div class="saved-title">${title}</div>
               <div class="saved-meta">${meta}</div>
               <div class="match-reasons">
-                <span class="match-reason-pill">${escapeHtml(label)} ${escapeHtml(delta)}</span>
+                <span class="match-reason-pill">${escapeHtml(label)}${escapeHtml(delta)}</span>
               </div>
             </div>
             <div class="saved-actions">
@@ -2034,11 +2103,15 @@ function openPulse() {
         ? pulseState.priceIncreases.map(evt => renderEventRow(evt, 'Price increased')).join('')
         : '';
 
+    const newListings = Array.isArray(pulseState?.newListings) ? pulseState.newListings : [];
+    const newHtml = newListings.slice(0, 10).map(evt => renderEventRow(evt, 'New listing')).join('');
+
     pulseBody.innerHTML = `
       <div class="ai-brief-card">
         <div class="ai-brief-label">Pulse Summary</div>
         <div class="ai-brief-value">${favorites.size.toLocaleString()} saved • ${compare.size.toLocaleString()} compared</div>
         <div class="ai-brief-note">${dropCount.toLocaleString()} drops • ${increaseCount.toLocaleString()} increases • tracking ${trackedCount.toLocaleString()} cars</div>
+        ${changeFeed?.previousAt ? `<div class="ai-brief-note">Since the last crawl: ${(changeFeed.new || []).length.toLocaleString()} new • ${(changeFeed.removed || []).length.toLocaleString()} sold or removed • ${(changeFeed.repriced || []).length.toLocaleString()} repriced</div>` : ''}
       </div>
       <div class="ai-brief-card">
         <div class="ai-brief-label">Price Drop Pulse</div>
@@ -2052,6 +2125,13 @@ function openPulse() {
           <div class="ai-similar-stack">${increasesHtml}</div>
         </div>
       ` : ''}
+      ${newHtml ? `
+        <div class="ai-brief-card">
+          <div class="ai-brief-label">New Since Last Crawl</div>
+          <div class="ai-brief-note">Listings that first appeared in the latest crawl.</div>
+          <div class="ai-similar-stack">${newHtml}</div>
+        </div>
+      ` : ''}
     `;
 
     pulseModal.classList.add('open');
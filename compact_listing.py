@@ -0,0 +1,116 @@
+"""
+Compact Listings
+================
+A raw search record is a dict with dozens of keys, many of them nested,
+while the front end (normalizeCar in app.js, details.js) reads about 30.
+CompactListing keeps only those fields in a slotted object. Repeated
+strings such as make, model, colour and dealer names are interned, so
+50k listings share one copy of each.
+
+CompactListing behaves like a read-only dict of the fields it kept (get,
+[], in, keys, dict(listing), {**listing}), so the scrapers, the listing
+log and the SQLite store take it in place of the raw record. Pass
+keep_raw=True (or run with --keep-raw) to keep the full payload as well.
+When it is kept, it is what gets written out.
+"""
+
+import sys
+
+KEEP_RAW = "--keep-raw" in sys.argv
+
+# Raw keys read by normalizeCar (app.js) and details.js, plus sellerId for detail enrichment
+FIELDS = (
+    "id", "listingTitle", "carYear", "makeName", "modelName", "trimName",
+    "price", "mileage", "localizedExteriorColor", "exteriorColorName",
+    "localizedInteriorColor", "interiorColor", "localizedTransmission",
+    "localizedFuelType", "localizedDriveTrain", "driveTrain", "bodyTypeName",
+    "pictureUrl", "dealRating", "dealScore", "priceDifferential",
+    "serviceProviderName", "dealerName", "sellerId", "sellerRating",
+    "reviewCount", "phoneNumberString", "sellerCity", "sellerRegion",
+    "sellerPostalCode", "distance", "options", "vin", "stockNumber",
+    "daysOnMarket", "localizedEngineDisplayName",
+)
+# Low-cardinality strings shared by many listings
+INTERNED = {
+    "makeName", "modelName", "trimName", "localizedExteriorColor",
+    "exteriorColorName", "localizedInteriorColor", "interiorColor",
+    "localizedTransmission", "localizedFuelType", "localizedDriveTrain",
+    "driveTrain", "bodyTypeName", "dealRating", "serviceProviderName",
+    "dealerName", "sellerCity", "sellerRegion", "localizedEngineDisplayName",
+}
+# originalPictureData is nested in the raw record; only its url is kept
+PICTURE_KEY = "originalPictureData"
+
+
+class CompactListing:
+    """The fields of a search record the front end uses, as a read-only mapping."""
+
+    __slots__ = FIELDS + ("raw",)
+
+    def __init__(self, raw=None, **fields):
+        self.raw = raw
+        for name in FIELDS:
+            value = fields.get(name)
+            if name in INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            elif name == "options" and value:
+                value = tuple(sys.intern(o) if isinstance(o, str) else o for o in value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_raw(cls, item, keep_raw=KEEP_RAW):
+        """Project a raw (or previously projected) record; passes CompactListings through."""
+        if isinstance(item, cls):
+            return item
+        picture = item.get(PICTURE_KEY)
+        return cls(
+            raw=item if keep_raw else None,
+            pictureUrl=picture.get("url") if isinstance(picture, dict) else None,
+            **{name: item.get(name) for name in FIELDS if name != "pictureUrl"},
+        )
+
+    def keys(self):
+        if self.raw is not None:
+            return self.raw.keys()
+        keys = [name for name in FIELDS if name != "pictureUrl" and getattr(self, name) is not None]
+        if self.pictureUrl is not None:
+            keys.append(PICTURE_KEY)
+        return keys
+
+    def __getitem__(self, key):
+        if self.raw is not None:
+            return self.raw[key]
+        if key == PICTURE_KEY and self.pictureUrl is not None:
+            return {"url": self.pictureUrl}
+        value = getattr(self, key, None) if key in FIELDS and key != "pictureUrl" else None
+        if value is None:
+            raise KeyError(key)
+        return list(value) if key == "options" else value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"CompactListing(id={self.id!r}, {self.carYear} {self.makeName} {self.modelName})"
+
+
+def to_json(obj):
+    """json.dump default= hook for CompactListing values."""
+    if isinstance(obj, CompactListing):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,89 @@
+"""
+Crawl Cursor
+============
+Persists a crawl's exact position so an interrupted run resumes where it
+stopped instead of re-issuing every request from strategy 1. The cursor
+records the current strategy index, the parameter sets of that strategy
+that have completed, the dead-letter list and the run counters. It is
+written atomically and removed once the crawl finishes.
+
+Listings are checkpointed separately (listing_log); save the cursor only
+after flushing the log so completed requests always have their listings
+on disk.
+"""
+
+import json
+import os
+
+
+def params_key(params):
+    """Stable identity for a parameter set."""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class CrawlCursor:
+    """Strategy index plus the completed parameter sets within it."""
+
+    def __init__(self, path):
+        self.path = path
+        self.strategy = 0
+        self.completed = set()
+        self.dead_letters = []
+        self.counters = {}
+        self.resumed = False
+
+    def load(self):
+        """Restore a saved cursor. Returns True when resuming an interrupted run."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.strategy = state.get("strategy", 0)
+        self.completed = set(state.get("completed", []))
+        self.dead_letters = state.get("dead_letters", [])
+        self.counters = state.get("counters", {})
+        self.resumed = True
+        return True
+
+    def begin(self, strategy):
+        """Enter a strategy. Returns False if it already finished in an earlier run."""
+        if strategy < self.strategy:
+            return False
+        if strategy > self.strategy:
+            self.strategy = strategy
+            self.completed = set()
+        return True
+
+    def is_done(self, params):
+        return params_key(params) in self.completed
+
+    def remaining(self, param_sets):
+        """The parameter sets of the current strategy not yet completed."""
+        return [params for params in param_sets if params_key(params) not in self.completed]
+
+    def mark(self, params):
+        self.completed.add(params_key(params))
+
+    def save(self, dead_letters=None, counters=None):
+        if dead_letters is not None:
+            self.dead_letters = dead_letters
+        if counters is not None:
+            self.counters = counters
+        state = {
+            "strategy": self.strategy,
+            "completed": sorted(self.completed),
+            "dead_letters": self.dead_letters,
+            "counters": self.counters,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """The crawl finished; the next run starts from the beginning."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
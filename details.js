@@ -14,9 +14,13 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
 
     try {
-        const response = await fetch('cars.json');
-        const cars = await response.json();
-        car = cars.find(c => String(c.id) === carId);
+        car = await loadListingDoc(carId);
+        if (!car) {
+            let response = await fetch('cars.min.json');
+            if (!response.ok) response = await fetch('cars.json');
+            const cars = await response.json();
+            car = cars.find(c => String(c.id) === carId);
+        }
 
         if (!car) {
             window.location.href = 'index.html';
@@ -31,6 +35,40 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
 });
 
+// Ids sort by (length, text), the order listing_docs.py writes them in
+function compareIds(a, b) {
+    return a.length - b.length || (a < b ? -1 : a > b ? 1 : 0);
+}
+
+// One listing from the bucketed detail documents (listing_docs.py), or null if they are not published
+async function loadListingDoc(carId) {
+    try {
+        const response = await fetch('listing/index.json');
+        if (!response.ok) return null;
+        const { buckets } = await response.json();
+
+        // Last bucket whose first id is <= carId
+        let lo = 0, hi = buckets.length - 1, found = -1;
+        while (lo <= hi) {
+            const mid = (lo + hi) >> 1;
+            if (compareIds(buckets[mid], carId) <= 0) {
+                found = mid;
+                lo = mid + 1;
+            } else {
+                hi = mid - 1;
+            }
+        }
+        if (found < 0) return null;
+
+        const doc = await fetch(`listing/${found}.json`);
+        if (!doc.ok) return null;
+        return (await doc.json())[carId] || null;
+    } catch (error) {
+        console.warn('Listing documents unavailable, loading full inventory:', error);
+        return null;
+    }
+}
+
 // Staggered content reveal animation with Apple-style easing
 function setupAnimations() {
     const sections = document.querySelectorAll('.info-section, .quick-stats, .price-card, .contact-card, .dealer-card');
@@ -292,7 +330,7 @@ function renderCarDetails() {
         { icon: '⚙️', label: 'Drivetrain', value: car.localizedDriveTrain || car.drivetrain || 'FWD' },
         { icon: '🎨', label: 'Exterior', value: car.localizedExteriorColor || car.exteriorColor || 'N/A' },
         { icon: '💺', label: 'Interior', value: car.localizedInteriorColor || car.interiorColor || 'N/A' },
-        { icon: '🔧', label: 'Engine', value: car.localizedEngineDisplayName || 'N/A' },
+        { icon: '🔧', label: 'Engine', value: car.localizedEngineDisplayName || car.engine || 'N/A' },
         { icon: '⛽', label: 'Fuel', value: car.localizedFuelType || car.fuelType || 'Gasoline' },
         { icon: '🔄', label: 'Transmission', value: car.localizedTransmission || car.transmission || 'Auto' },
         { icon: '🚗', label: 'Body', value: car.bodyTypeName || car.bodyType || 'Sedan' }
@@ -325,11 +363,11 @@ function renderCarDetails() {
         { label: 'Year', value: year },
         { label: 'Trim', value: trim || 'Base' },
         { label: 'Body Style', value: car.bodyTypeName || car.bodyType || 'Sedan' },
-        { label: 'Ext. Color', value: car.localizedExteriorColor || 'Unknown' },
-        { label: 'Int. Color', value: car.localizedInteriorColor || 'Unknown' },
+        { label: 'Ext. Color', value: car.localizedExteriorColor || car.exteriorColor || 'Unknown' },
+        { label: 'Int. Color', value: car.localizedInteriorColor || car.interiorColor || 'Unknown' },
         { label: 'Stock #', value: car.stockNumber || 'N/A' },
         { label: 'VIN', value: car.vin || 'Call for VIN' },
-        { label: 'Days Listed', value: car.daysOnMarket || 'Just Listed' }
+        { label: 'Days Listed', value: daysListed(car) || 'Just Listed' }
     ];
 
     const specsGrid = document.getElementById('specs-grid');
@@ -375,6 +413,15 @@ function animatePrice(element, start, end, duration) {
     requestAnimationFrame(update);
 }
 
+// Listing documents carry listedDate (listing_docs.py); the site file carries daysOnMarket
+function daysListed(car) {
+    if (car.listedDate) {
+        const days = Math.floor((Date.now() - Date.parse(car.listedDate)) / 86400000);
+        return days > 0 ? days : 0;
+    }
+    return car.daysOnMarket || 0;
+}
+
 function safeSetText(id, text) {
     const el = document.getElementById(id);
     if (el) el.textContent = text;
@@ -0,0 +1,82 @@
+"""
+Detail Enrichment
+=================
+Fetches detail endpoints for listings as a separate stage with its own
+worker pool (and, through the part fetcher, its own rate limiter). Each
+listing is split into one work item per endpoint so both endpoints of a
+listing are in flight at the same time; the parts are merged when the last
+one arrives and the record is streamed to the detail log.
+
+Only listings that are new or whose search record changed since they were
+last enriched are fetched: every detailed record carries a fingerprint of
+the search record it was built from (its content hash, see normalize).
+"""
+
+from fetch_engine import FetchEngine
+from listing_log import ListingLog
+from normalize import content_hash
+
+DETAIL_IN_FLIGHT = 8
+FINGERPRINT_KEY = "detailFingerprint"
+
+
+def listing_fingerprint(listing):
+    """Hash of a search record; changes whenever a field the site shows changes."""
+    return content_hash(listing)
+
+
+class DetailEnricher:
+    """Enrich new or changed listings with detail endpoints, streamed to a JSONL log."""
+
+    def __init__(self, fetch_part, parts, session_factory, output_file,
+                 max_in_flight=DETAIL_IN_FLIGHT, retry_queue=None):
+        # fetch_part(session, (listing, part)) -> dict of details
+        self.parts = list(parts)
+        self.engine = FetchEngine(fetch_part, session_factory, max_in_flight, retry_queue)
+        self.log = ListingLog(output_file)
+        self.enriched = 0
+        self.incomplete = 0
+        self._fingerprints = {}
+
+    def load(self):
+        """Read fingerprints of listings enriched by earlier runs."""
+        self._fingerprints = {lid: item.get(FINGERPRINT_KEY) for lid, item in self.log.load().items()}
+        return len(self._fingerprints)
+
+    def pending(self, listings):
+        """Listings that are new or changed since they were last enriched."""
+        return [
+            listing for listing in listings
+            if listing.get('id') and self._fingerprints.get(listing['id']) != listing_fingerprint(listing)
+        ]
+
+    def run(self, listings, progress_every=200, flush_every=100):
+        """Enrich the given listings. Returns how many records were written."""
+        work = ((listing, part) for listing in listings for part in self.parts)
+        partial = {}
+        for (listing, part), details in self.engine.map(work):
+            lid = listing['id']
+            received, merged = partial.setdefault(lid, [0, {}])
+            merged.update(details)
+            received += 1
+            if received < len(self.parts):
+                partial[lid][0] = received
+                continue
+            del partial[lid]
+            fingerprint = listing_fingerprint(listing)
+            self.log.append({**listing, "details": merged, FINGERPRINT_KEY: fingerprint})
+            self._fingerprints[lid] = fingerprint
+            self.enriched += 1
+            if self.enriched % flush_every == 0:
+                self.log.flush()
+            if self.enriched % progress_every == 0:
+                print(f"  {self.enriched}/{len(listings)} listings enriched")
+        # A part that was dead-lettered leaves its listing unwritten; it stays
+        # pending and is fetched again on the next run
+        self.incomplete = len(partial)
+        self.log.flush()
+        return self.enriched
+
+    def compact(self):
+        """Rewrite the detail output from the log once, at the end of the stage."""
+        return self.log.compact(self.log.load())
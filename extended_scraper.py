@@ -7,6 +7,8 @@ import requests
 import json
 import time
 
+from listing_stats import report
+
 def scrape_by_make(session, zip_code, make_id, max_per_make=100):
     """Scrape listings for a specific make."""
     endpoint = f"https://www.cargurus.com/Cars/searchResults.action"
@@ -196,19 +198,7 @@ def main():
     print(f"{'=' * 60}")
     
     # Stats
-    makes_count = {}
-    for listing in result:
-        make = listing.get("makeName", "Unknown")
-        makes_count[make] = makes_count.get(make, 0) + 1
-    
-    print("\nTop 15 Makes:")
-    for make, count in sorted(makes_count.items(), key=lambda x: -x[1])[:15]:
-        print(f"  {make}: {count}")
-    
-    prices = [l.get("price", 0) for l in result if l.get("price", 0) > 0]
-    if prices:
-        print(f"\nPrice Range: ${min(prices):,.0f} - ${max(prices):,.0f}")
-        print(f"Average Price: ${sum(prices)/len(prices):,.0f}")
+    report(result, top=15, indent="")
 
 
 if __name__ == "__main__":
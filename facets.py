@@ -0,0 +1,72 @@
+"""
+Facet Index
+===========
+Counts and bounds over the normalized listings, written next to the site
+file. The browse page fills its filter controls and headline stats from
+this file instead of scanning every listing. The price and mileage facets
+are listing_stats.summarize, the same code that builds the scrapers'
+end-of-run statistics, so the two cannot drift apart.
+
+    {"total": 46837,
+     "makes": {"Toyota": 5120, ...},
+     "models": {"Toyota": {"Camry": 812, ...}, ...},
+     "years": {"2024": 3100, ...}, "bodyTypes": {...}, "fuelTypes": {...},
+     "price": {"count": 46620, "min": 1995.0, "max": 289000.0, "mean": 31250.4,
+               "percentiles": {"5": ..., "50": ..., ...},
+               "binStart": 0.0, "binSize": 5000, "histogram": [120, 2410, ...]},
+     "mileage": {...}}
+
+Histogram bin i counts values in [binStart + i * binSize, binStart +
+(i + 1) * binSize). Zero or missing prices and mileages are left out of
+the numeric facets, as the statistics have always done.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from listing_stats import MILEAGE_BIN, PRICE_BIN, summarize
+
+FACETS_FILE = "facets.json"
+
+
+def _count(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+
+
+def _numeric(cars, field, bin_size):
+    return summarize(np.array([car.get(field) or np.nan for car in cars], dtype=float), bin_size)
+
+
+def _by_count(counts):
+    return dict(sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0]))))
+
+
+def build_facets(cars):
+    """Facet counts and numeric bounds for normalized listings."""
+    makes, models, years, body_types, fuel_types = {}, {}, {}, {}, {}
+    for car in cars:
+        make = car.get("make") or "Unknown"
+        _count(makes, make)
+        _count(models.setdefault(make, {}), car.get("model") or "Unknown")
+        _count(years, str(car.get("year")))
+        _count(body_types, car.get("bodyType") or "Unknown")
+        _count(fuel_types, car.get("fuelType") or "Unknown")
+    return {
+        "total": sum(makes.values()),
+        "makes": _by_count(makes),
+        "models": {make: _by_count(counts) for make, counts in sorted(models.items())},
+        "years": dict(sorted(years.items(), reverse=True)),
+        "bodyTypes": _by_count(body_types),
+        "fuelTypes": _by_count(fuel_types),
+        "price": _numeric(cars, "price", PRICE_BIN),
+        "mileage": _numeric(cars, "mileage", MILEAGE_BIN),
+    }
+
+
+def write_facets(facets, path=FACETS_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(facets, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
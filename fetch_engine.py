@@ -0,0 +1,89 @@
+"""
+Concurrent Fetch Engine
+=======================
+Runs many search requests in parallel on a bounded worker pool. Request rate
+is governed by the fetch function's shared AdaptiveRateLimiter, so the pool
+only bounds concurrency. Each worker thread gets its own session from the
+scraper's session factory so headers stay identical to the sequential
+scrapers. Requests that raise FetchError go to an optional RetryQueue and
+are resubmitted once their backoff has elapsed.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from retry_queue import FetchError
+
+MAX_IN_FLIGHT = 8  # concurrent requests
+
+_DONE = object()
+
+
+class FetchEngine:
+    """Submit parameter sets to a thread pool and yield results as they complete."""
+
+    def __init__(self, fetch, session_factory, max_in_flight=MAX_IN_FLIGHT, retry_queue=None):
+        self.fetch = fetch
+        self.session_factory = session_factory
+        self.max_in_flight = max(1, max_in_flight)
+        self.retry_queue = retry_queue
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self.session_factory()
+            self._local.session = session
+        return session
+
+    def _run(self, params):
+        return self.fetch(self._session(), params)
+
+    def map(self, param_sets):
+        """
+        Fetch every parameter set, yielding (params, listings) in completion order.
+        At most max_in_flight requests are outstanding; closing the generator
+        early stops further submissions. With a retry queue, failed requests
+        are retried (ahead of new work) until they succeed or are dead-lettered,
+        and the generator only finishes once the queue is empty.
+        """
+        param_iter = iter(param_sets)
+        retry = self.retry_queue
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            pending = {}
+
+            def fill():
+                while len(pending) < self.max_in_flight:
+                    if retry is not None and len(retry) and retry.wait_time() == 0:
+                        params, attempts = retry.ready(limit=1)[0]
+                    else:
+                        params = next(param_iter, _DONE)
+                        if params is _DONE:
+                            return
+                        attempts = 0
+                    pending[pool.submit(self._run, params)] = (params, attempts)
+
+            try:
+                fill()
+                while pending or (retry is not None and len(retry)):
+                    if not pending:
+                        time.sleep(retry.wait_time())
+                        fill()
+                        continue
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        params, attempts = pending.pop(future)
+                        try:
+                            listings = future.result()
+                        except FetchError as e:
+                            if retry is None:
+                                yield params, []
+                            else:
+                                retry.record(params, e, attempts)
+                            continue
+                        yield params, listings
+                    fill()
+            finally:
+                for future in pending:
+                    future.cancel()
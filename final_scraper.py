@@ -1,146 +1,231 @@
 """
 CarGurus Final Scraper - The Slicer Strategy
-Uses searchResults.action (limit 48) with highly granular filters to slice the inventory.
+Uses searchResults.action (limit 48) with adaptively bisected filters to slice the inventory.
 Target: 46,837+ listings
+
+    python final_scraper.py              single process
+    python final_scraper.py --shards 4   makes split across 4 processes, then merged
+    python final_scraper.py --shard 2/4  (re)run one shard only
 """
 
 import requests
 import json
 import time
-import os
 import sys
+from multiprocessing import Process
+
+from fetch_engine import FetchEngine
+from listing_log import ListingLog
+from normalize import SITE_FILE, publish
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from response_cache import ResponseCache
+from retry_queue import FetchError, RetryQueue
+from sharding import merge_shards, partition, shard_complete, shard_path
+from slicer import Slice, SlicePlanner
 
 # Fix encoding
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
+SEARCH_URL = "https://www.cargurus.com/Cars/searchResults.action"
 OUTPUT_FILE = "cars.json"
+SLICE_REPORT_FILE = "slice_report.json"
+DEAD_LETTER_FILE = "dead_letters_final.json"
+MAX_IN_FLIGHT = 8
+MAX_REQUESTS_PER_SECOND = 20.0  # adaptive rate limiter ceiling
 all_listings = {}
+seen_this_run = set()  # ids returned by this process's requests, for the change feed
+rate_limiter = AdaptiveRateLimiter(rate=10.0, max_rate=MAX_REQUESTS_PER_SECOND)
+listing_log = ListingLog(OUTPUT_FILE)
+
+MAKES = [
+    "m7", "m6", "m3", "m1", "m10", "m41", "m47", "m32", "m21", "m17",
+    "m27", "m28", "m53", "m30", "m22", "m191", "m55", "m56", "m2", "m35",
+    "m29", "m31", "m16", "m148", "m33", "m38", "m46", "m18", "m24", "m42"
+]
+
+# Base params
+BASE_PARAMS = {
+    "zip": "77479",
+    "inventorySearchWidgetType": "AUTO",
+    "distance": 500,
+    "maxResults": 100, # Request 100, get 48
+    "sortType": "DEAL_SCORE"
+}
 
 def load_existing():
     global all_listings
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, encoding='utf-8') as f:
-                for l in json.load(f):
-                    if l.get('id'):
-                        all_listings[l['id']] = l
-            print(f"Loaded {len(all_listings)} existing listings")
-        except:
-            pass
+    all_listings = listing_log.load()
+    if all_listings:
+        print(f"Loaded {len(all_listings)} existing listings")
 
 def save_listings():
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(all_listings.values()), f)
+    listing_log.flush()
     return len(all_listings)
 
+def create_session():
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+        "Accept": "application/json",
+        "X-Requested-With": "XMLHttpRequest"
+    })
+    return session
+
 def fetch_listings(session, params):
-    url = "https://www.cargurus.com/Cars/searchResults.action"
+    rate_limiter.acquire()
+    try:
+        r = session.get(SEARCH_URL, params=params, timeout=15)
+    except requests.exceptions.RequestException as e:
+        raise FetchError(f"{type(e).__name__}: {e}")
+    if r.status_code in (429, 403):
+        rate_limiter.on_throttle(parse_retry_after(r.headers.get("Retry-After")))
+    if r.status_code != 200:
+        raise FetchError(f"HTTP {r.status_code}", r.status_code)
+    rate_limiter.on_success()
     try:
-        r = session.get(url, params=params, timeout=15)
-        if r.status_code == 200:
-            data = r.json()
-            if isinstance(data, list):
-                return data
-            return []
-        elif r.status_code == 429:
-            time.sleep(2)
-    except:
-        pass
+        data = r.json()
+    except ValueError:
+        raise FetchError("Invalid JSON", r.status_code)
+    if isinstance(data, list):
+        return data
     return []
 
-def main():
-    print("=" * 60)
-    print("CarGurus Final Scraper - Slicer Strategy")
-    print("Target: 46,837+ listings")
-    print("=" * 60)
-    
+def crawl(makes, output_file=OUTPUT_FILE, report_file=SLICE_REPORT_FILE,
+          dead_letter_file=DEAD_LETTER_FILE, max_in_flight=MAX_IN_FLIGHT):
+    """Slice the given makes and save every listing found to output_file."""
+    global listing_log
+    listing_log = ListingLog(output_file)
     load_existing()
     initial = len(all_listings)
     
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
-        "Accept": "application/json",
-        "X-Requested-With": "XMLHttpRequest"
-    })
+    # Slice the inventory adaptively: each make starts as one wide slice and
+    # is only bisected (price, year, mileage) while it keeps hitting the cap
     
-    # Generate granular filters
-    # We need to slice the data so small that each slice has < 48 cars
+    start = time.time()
+    last_save = initial
     
-    makes = [
-        "m7", "m6", "m3", "m1", "m10", "m41", "m47", "m32", "m21", "m17",
-        "m27", "m28", "m53", "m30", "m22", "m191", "m55", "m56", "m2", "m35",
-        "m29", "m31", "m16", "m148", "m33", "m38", "m46", "m18", "m24", "m42"
-    ]
+    planner = SlicePlanner(makes)
+    retry_queue = RetryQueue(encode=Slice.to_dict, decode=Slice.from_dict)
+    response_cache = ResponseCache()
+    cached_fetch = response_cache.wrap(fetch_listings, SEARCH_URL)
+    engine = FetchEngine(
+        lambda session, sl: cached_fetch(session, sl.params(BASE_PARAMS)),
+        create_session,
+        max_in_flight,
+        retry_queue
+    )
     
-    years = range(2010, 2026)
+    carried_over = retry_queue.load(dead_letter_file)
+    if carried_over:
+        print(f"Retrying {carried_over} failed slices from the previous run")
     
-    # Price buckets: $5k increments
-    prices = []
-    for p in range(0, 100000, 5000):
-        prices.append((p, p + 5000))
-    prices.append((100000, 500000))
+    wave_no = 0
+    replayed = False
+    # Failed slices are retried within their wave; dead letters get one final
+    # replay (which may bisect them into further waves) once the frontier is empty
+    while planner.pending or len(retry_queue) or (retry_queue.dead_letters and not replayed):
+        if not planner.pending and not len(retry_queue):
+            replayed = True
+            print(f"Replaying {retry_queue.requeue_dead_letters()} dead-lettered slices")
+        wave = planner.take()
+        wave_no += 1
+        print(f"Wave {wave_no}: {len(wave)} slices" + (f" + {len(retry_queue)} retries" if len(retry_queue) else ""))
+        
+        for sl, listings in engine.map(wave):
+            planner.record(sl, len(listings))
+            
+            for l in listings:
+                lid = l.get('id')
+                if lid:
+                    seen_this_run.add(lid)
+                if lid and lid not in all_listings:
+                    all_listings[lid] = l
+                    listing_log.append(l)
+            
+            # Progress
+            if planner.requests % 100 == 0:
+                elapsed = time.time() - start
+                rate = (len(all_listings) - initial) / max(elapsed, 1)
+                print(f"Progress: {planner.requests} reqs | Total: {len(all_listings)} (+{len(all_listings)-initial}) | Rate: {rate:.1f}/s")
+            
+            # Save periodically
+            if len(all_listings) - last_save >= 500:
+                save_listings()
+                last_save = len(all_listings)
+                print(f"  [Saved {last_save}]")
     
-    # Base params
-    base_params = {
-        "zip": "77479",
-        "inventorySearchWidgetType": "AUTO",
-        "distance": 500,
-        "maxResults": 100, # Request 100, get 48
-        "sortType": "DEAL_SCORE"
-    }
+    failed = retry_queue.save(dead_letter_file)
     
-    start = time.time()
-    last_save = initial
+    report = planner.report()
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
     
-    # Total combinations
-    total_combos = len(makes) * len(years) * len(prices)
-    print(f"Processing {total_combos} filter combinations...")
+    print(f"\n{report['requests']} requests ({response_cache.hits} from cache), {report['splits']} splits")
+    if report['unsplittable']:
+        print(f"WARNING: {len(report['unsplittable'])} slices still at the cap and could not be split:")
+        for item in report['unsplittable'][:20]:
+            print(f"  {item['slice']}")
+        print(f"  (full list in {report_file})")
+    if failed:
+        print(f"WARNING: {failed} slices still failing after {retry_queue.retried} retries (saved to {dead_letter_file})")
     
-    count = 0
+    final = listing_log.compact(all_listings)
+    print(f"\nDONE! {final} listings saved to {output_file}.")
+    return final
+
+def run_shard(index, shard_count):
+    """Crawl one shard of the makes into its own files, with a 1/N share of the rate budget."""
+    rate_limiter.max_rate = MAX_REQUESTS_PER_SECOND / shard_count
+    rate_limiter.rate = min(rate_limiter.rate, rate_limiter.max_rate)
+    crawl(
+        partition(MAKES, shard_count)[index],
+        shard_path(OUTPUT_FILE, index, shard_count),
+        shard_path(SLICE_REPORT_FILE, index, shard_count),
+        shard_path(DEAD_LETTER_FILE, index, shard_count),
+        max(1, MAX_IN_FLIGHT // shard_count),
+    )
+
+def run_sharded(shard_count):
+    """Run every incomplete shard in its own process, then merge if all shards completed."""
+    outputs = [shard_path(OUTPUT_FILE, i, shard_count) for i in range(shard_count)]
+    workers = []
+    for i, path in enumerate(outputs):
+        if shard_complete(path):
+            print(f"Shard {i + 1}/{shard_count} already complete")
+            continue
+        worker = Process(target=run_shard, args=(i, shard_count), name=f"shard-{i + 1}")
+        worker.start()
+        workers.append((i, worker))
+    for i, worker in workers:
+        worker.join()
+        if worker.exitcode:
+            print(f"Shard {i + 1}/{shard_count} failed (exit {worker.exitcode})")
+    
+    incomplete = [i + 1 for i, path in enumerate(outputs) if not shard_complete(path)]
+    if incomplete:
+        print(f"Not merging: shard(s) {incomplete} incomplete. Rerun them with "
+              f"--shard K/{shard_count}, then --shards {shard_count} again to merge.")
+        return
+    final = merge_shards(OUTPUT_FILE, outputs)
+    publish(ListingLog(OUTPUT_FILE).load().values())
+    print(f"\nMERGED {shard_count} shards: {final} listings saved to {OUTPUT_FILE} (site file: {SITE_FILE}).")
+
+def main():
+    print("=" * 60)
+    print("CarGurus Final Scraper - Slicer Strategy")
+    print("Target: 46,837+ listings")
+    print("=" * 60)
     
-    # Iterate
-    for make in makes:
-        for year in years:
-            for min_p, max_p in prices:
-                count += 1
-                
-                params = base_params.copy()
-                params.update({
-                    "makeId": make,
-                    "startYear": year,
-                    "endYear": year,
-                    "minPrice": min_p,
-                    "maxPrice": max_p
-                })
-                
-                listings = fetch_listings(session, params)
-                
-                new_in_batch = 0
-                for l in listings:
-                    lid = l.get('id')
-                    if lid and lid not in all_listings:
-                        all_listings[lid] = l
-                        new_in_batch += 1
-                
-                # Progress
-                if count % 100 == 0:
-                    elapsed = time.time() - start
-                    rate = (len(all_listings) - initial) / max(elapsed, 1)
-                    print(f"Progress: {count}/{total_combos} reqs | Total: {len(all_listings)} (+{len(all_listings)-initial}) | Rate: {rate:.1f}/s")
-                
-                # Save periodically
-                if len(all_listings) - last_save >= 500:
-                    save_listings()
-                    last_save = len(all_listings)
-                    print(f"  [Saved {last_save}]")
-                
-                # Polite delay
-                time.sleep(0.05)
-                
-    final = save_listings()
-    print(f"\nDONE! {final} listings saved.")
+    args = sys.argv[1:]
+    if "--shards" in args:
+        run_sharded(int(args[args.index("--shards") + 1]))
+    elif "--shard" in args:
+        index, shard_count = map(int, args[args.index("--shard") + 1].split("/"))
+        run_shard(index - 1, shard_count)
+    else:
+        crawl(MAKES)
+        print(f"Published {publish(all_listings.values(), seen=seen_this_run)} listings to {SITE_FILE}")
 
 if __name__ == "__main__":
     main()
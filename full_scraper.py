@@ -6,6 +6,8 @@ import requests
 import json
 import time
 
+from listing_stats import report
+
 def scrape_cargurus_full(zip_code="77479", max_results=1000):
     """Scrape real car listings from CarGurus with pagination."""
     
@@ -91,19 +93,7 @@ def main():
         print(f"{'=' * 60}")
         
         # Stats
-        makes = {}
-        for listing in listings:
-            make = listing.get("makeName", "Unknown")
-            makes[make] = makes.get(make, 0) + 1
-        
-        print("\nTop Makes:")
-        for make, count in sorted(makes.items(), key=lambda x: -x[1])[:10]:
-            print(f"  {make}: {count}")
-        
-        prices = [l.get("price", 0) for l in listings if l.get("price", 0) > 0]
-        if prices:
-            print(f"\nPrice Range: ${min(prices):,.0f} - ${max(prices):,.0f}")
-            print(f"Average Price: ${sum(prices)/len(prices):,.0f}")
+        report(listings, top=10, indent="")
     else:
         print("No listings retrieved.")
 
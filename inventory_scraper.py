@@ -1,42 +1,68 @@
 """
 CarGurus Inventory Scraper - Using getFilteredInventoryListing API
 This endpoint supports proper pagination
+
+    python inventory_scraper.py            single process
+    python inventory_scraper.py --enqueue  load the filter sets into the work queue
+    python inventory_scraper.py --worker   lease and scrape filter sets (start as many as you like)
+    python inventory_scraper.py --export   write cars.json from the workers' listing store
 """
 
 import requests
-import json
 import time
-import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from listing_log import ListingLog
+from listing_store import ListingStore
+from normalize import SITE_FILE, publish
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from retry_queue import FetchError, RetryQueue
+from work_queue import LeaseLost, WorkQueue, worker_id
 
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
 OUTPUT_FILE = "cars.json"
+DEAD_LETTER_FILE = "dead_letters_inventory.json"
+QUEUE_FILE = "inventory_queue.db"
+LISTING_DB = "cars.db"  # shared by queue workers
+PAGE_SIZE = 100
+MAX_OFFSET = 2000
+PREFETCH_WINDOW = 4  # pages of one filter set kept in flight
+MAX_REQUESTS_PER_SECOND = 10.0  # adaptive rate limiter ceiling
+# Keys under which the endpoint may report the filter set's total size
+TOTAL_COUNT_KEYS = ("totalListings", "totalResultCount", "totalCount", "total")
 all_listings = {}
+seen_this_run = set()  # ids returned by this run's requests, for the change feed
+listing_log = ListingLog(OUTPUT_FILE)
+retry_queue = RetryQueue()  # failed filter sets
+rate_limiter = AdaptiveRateLimiter(rate=5.0, max_rate=MAX_REQUESTS_PER_SECOND)
+page_pool = ThreadPoolExecutor(max_workers=PREFETCH_WINDOW)
+_local = threading.local()
 
 
 def load_existing():
     global all_listings
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, encoding='utf-8') as f:
-                for l in json.load(f):
-                    if l.get('id'):
-                        all_listings[l['id']] = l
-            print(f"Loaded {len(all_listings)} existing listings")
-        except:
-            pass
+    all_listings = listing_log.load()
+    if all_listings:
+        print(f"Loaded {len(all_listings)} existing listings")
+
+
+def retry_failed():
+    """Work through the retry queue until every filter set succeeds or is dead-lettered."""
+    for _ in retry_queue.drain(lambda filters: scrape_filter_set(filters, all_listings, listing_log.append, seen=seen_this_run)):
+        pass
 
 
 def save_listings():
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(all_listings.values()), f)
+    listing_log.flush()
     return len(all_listings)
 
 
-def scrape_page(session, offset=0, filters=None):
-    """Scrape a page of listings."""
+def fetch_page(session, offset=0, filters=None):
+    """Fetch a page of listings. Returns (listings, total or None if not reported)."""
     base_url = "https://www.cargurus.com/Cars/getFilteredInventoryListing.action"
     
     params = {
@@ -52,30 +78,37 @@ def scrape_page(session, offset=0, filters=None):
     if filters:
         params.update(filters)
     
+    rate_limiter.acquire()
     try:
         r = session.get(base_url, params=params, timeout=30)
-        if r.status_code == 200:
-            data = r.json()
-            # This endpoint returns a dict with 'listings' key
-            if isinstance(data, dict):
-                return data.get('listings') or data.get('results') or []
-            elif isinstance(data, list):
-                return data
-    except Exception as e:
-        print(f"Error at offset {offset}: {e}")
-    return []
+    except requests.exceptions.RequestException as e:
+        raise FetchError(f"{type(e).__name__}: {e}")
+    if r.status_code in (429, 403):
+        rate_limiter.on_throttle(parse_retry_after(r.headers.get("Retry-After")))
+    if r.status_code != 200:
+        raise FetchError(f"HTTP {r.status_code}", r.status_code)
+    rate_limiter.on_success()
+    try:
+        data = r.json()
+    except ValueError:
+        raise FetchError("Invalid JSON", r.status_code)
+    # This endpoint returns a dict with 'listings' key
+    if isinstance(data, dict):
+        total = next((data[k] for k in TOTAL_COUNT_KEYS if isinstance(data.get(k), int)), None)
+        return data.get('listings') or data.get('results') or [], total
+    elif isinstance(data, list):
+        return data, None
+    return [], None
 
 
-def main():
-    print("=" * 60)
-    print("CarGurus Inventory Scraper - Granular Mode")
-    print("Target: 46,837+ listings")
-    print("=" * 60)
-    
-    load_existing()
-    initial = len(all_listings)
-    print(f"Starting with {initial} listings")
-    
+def _fetch_page_threaded(offset, filters):
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = create_session()
+    return fetch_page(session, offset, filters)
+
+
+def create_session():
     session = requests.Session()
     session.headers.update({
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
@@ -84,11 +117,11 @@ def main():
         "X-Requested-With": "XMLHttpRequest",
         "Referer": "https://www.cargurus.com/Cars/inventorylisting/viewDetailsFilterViewInventoryListing.action"
     })
-    
-    start = time.time()
-    last_save = initial
-    
-    # Generate granular filter sets
+    return session
+
+
+def build_filter_sets():
+    """Generate granular filter sets."""
     filter_sets = []
     
     # 1. Very granular price ranges (every $1000 up to $50k, then $2k up to $100k)
@@ -121,51 +154,202 @@ def main():
     for body in body_types:
         for min_p, max_p in price_buckets:
             filter_sets.append({"bodyTypeGroupId": body, "minPrice": min_p, "maxPrice": max_p})
+    
+    return filter_sets
+
+
+def scrape_filter_set(filters, listings_out, on_new=None, on_page=None, window=PREFETCH_WINDOW, seen=None):
+    """
+    Page through one filter set, adding new listings to listings_out (a dict
+    or ListingStore) and passing each to on_new. on_page is called after
+    every page (e.g. to heartbeat). Every id returned is added to the set
+    seen, if given. Returns the number of new listings.
+    Raises FetchError on a failed page.
+    
+    Up to `window` upcoming offsets are in flight at once. When a page
+    reports the total count, every remaining page is requested at once; a
+    short page marks the end and cancels the pages past it.
+    """
+    offsets = iter(range(0, MAX_OFFSET, PAGE_SIZE))
+    end = MAX_OFFSET  # first offset known to be past the last result
+    pending = {}
+    found = 0
+    
+    def submit():
+        for offset in offsets:
+            if offset >= end:
+                return False
+            pending[page_pool.submit(_fetch_page_threaded, offset, filters)] = offset
+            return True
+        return False
+    
+    for _ in range(window):
+        submit()
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                offset = pending.pop(future)
+                listings, total = future.result()
+                if on_page:
+                    on_page()
+                
+                new_count = 0
+                for l in listings:
+                    lid = l.get('id')
+                    if lid and seen is not None:
+                        seen.add(lid)
+                    if lid and lid not in listings_out:
+                        listings_out[lid] = l
+                        if on_new:
+                            on_new(l)
+                        new_count += 1
+                found += new_count
+                
+                if len(listings) < PAGE_SIZE:  # End of results for this filter
+                    end = min(end, offset + PAGE_SIZE)
+                # If we got results but no NEW ones, and we're deep in pagination, stop
+                if len(listings) > 0 and new_count == 0 and offset > 500:
+                    end = min(end, offset + PAGE_SIZE)
+                if total is not None:
+                    end = min(end, total)
+                    while submit():  # total known: fan out the rest
+                        pass
+            
+            for future, offset in list(pending.items()):
+                if offset >= end:
+                    future.cancel()
+                    del pending[future]
+            while len(pending) < window and submit():
+                pass
+    finally:
+        for future in pending:
+            future.cancel()
+    return found
+
+
+def open_store():
+    """The workers' shared store, importing cars.json and its log on first use."""
+    store = ListingStore(LISTING_DB)
+    if not len(store):
+        imported = store.upsert_many(listing_log.load().values())
+        if imported:
+            print(f"Imported {imported} existing listings into {LISTING_DB}")
+    return store
+
 
+def enqueue():
+    open_store().close()
+    queue = WorkQueue(QUEUE_FILE)
+    added = queue.enqueue(build_filter_sets())
+    print(f"Queued {added} new filter sets ({queue.counts()})")
+
+
+def run_worker():
+    """Lease filter sets from the queue until none are left, writing to the shared store."""
+    queue = WorkQueue(QUEUE_FILE)
+    store = open_store()
+    owner = worker_id()
+    print(f"Worker {owner} starting ({queue.counts()})")
+    
+    done = 0
+    while True:
+        leased = queue.lease(owner)
+        if not leased:
+            if not queue.outstanding():
+                break
+            # Everything left is leased by other workers; wait for them to finish or die
+            time.sleep(queue.lease_seconds / 4)
+            continue
+        for key, filters in leased:
+            def heartbeat():
+                if not queue.heartbeat(owner, key):
+                    raise LeaseLost(key)
+            
+            try:
+                found = scrape_filter_set(filters, store, on_page=heartbeat)
+            except LeaseLost:
+                # Another worker has the item now; keep what was found and move on
+                store.flush()
+                print(f"  {filters}: lease lost, left to its new owner")
+                continue
+            except FetchError as e:
+                store.flush()
+                queue.fail(owner, key, e)
+                print(f"  {filters}: {e}")
+                continue
+            store.flush()
+            queue.complete(owner, key, found)
+            done += 1
+            if done % 10 == 0:
+                print(f"  {done} filter sets done, {len(store)} listings in store ({queue.counts()})")
+    
+    store.close()
+    print(f"Worker {owner} finished: {done} filter sets ({queue.counts()})")
+
+
+def export():
+    store = open_store()
+    print(f"Exported {store.export_json(OUTPUT_FILE)} listings to {OUTPUT_FILE}")
+    print(f"Published {publish(store.values())} listings to {SITE_FILE}")
+
+
+def main():
+    print("=" * 60)
+    print("CarGurus Inventory Scraper - Granular Mode")
+    print("Target: 46,837+ listings")
+    print("=" * 60)
+    
+    load_existing()
+    initial = len(all_listings)
+    print(f"Starting with {initial} listings")
+    
+    start = time.time()
+    last_save = initial
+    
+    filter_sets = build_filter_sets()
     print(f"Generated {len(filter_sets)} granular filter sets to process")
     
+    carried_over = retry_queue.load(DEAD_LETTER_FILE)
+    if carried_over:
+        print(f"Retrying {carried_over} failed filter sets from the previous run")
+        retry_failed()
+    
     # Process filters
     for i, filters in enumerate(filter_sets):
         # Progress indicator
         if i % 10 == 0:
             print(f"Processing filter set {i+1}/{len(filter_sets)}...")
             
-        # Pagination for each filter
-        # We assume granular filters won't have > 1000 results usually, but we check
-        for offset in range(0, 2000, 100):
-            listings = scrape_page(session, offset, filters)
-            
-            if not listings:
-                break
-                
-            new_count = 0
-            for l in listings:
-                lid = l.get('id')
-                if lid and lid not in all_listings:
-                    all_listings[lid] = l
-                    new_count += 1
-            
-            # If we got results but no NEW ones, and we're deep in pagination, maybe skip
-            if len(listings) > 0 and new_count == 0 and offset > 500:
-                break
-                
-            # Periodic save
-            if len(all_listings) - last_save >= 500:
-                save_listings()
-                last_save = len(all_listings)
-                print(f"  [Saved {last_save} listings total]")
-                
-            time.sleep(0.1) # Fast but polite
-            
-            if len(listings) < 100: # End of results for this filter
-                break
+        try:
+            scrape_filter_set(filters, all_listings, listing_log.append, seen=seen_this_run)
+        except FetchError as e:
+            print(f"Error in filter set {filters}: {e} (queued for retry)")
+            retry_queue.record(filters, e)
+        
+        # Periodic save
+        if len(all_listings) - last_save >= 500:
+            save_listings()
+            last_save = len(all_listings)
+            print(f"  [Saved {last_save} listings total]")
                 
+    # Failed filter sets, then one last pass over the dead letters
+    retry_failed()
+    replayed = retry_queue.requeue_dead_letters()
+    if replayed:
+        print(f"Replaying {replayed} dead-lettered filter sets...")
+        retry_failed()
+    failed = retry_queue.save(DEAD_LETTER_FILE)
+    
     # Final save
-    final = save_listings()
+    final = listing_log.compact(all_listings)
+    publish(all_listings.values(), seen=seen_this_run)
     elapsed = time.time() - start
     
     print(f"\n{'=' * 60}")
-    print(f"COMPLETE: {final} listings scraped in {elapsed/60:.1f} minutes")
+    print(f"COMPLETE: {final} listings scraped in {elapsed/60:.1f} minutes (site file: {SITE_FILE})")
+    if failed:
+        print(f"{failed} filter sets still failing after {retry_queue.retried} retries (saved to {DEAD_LETTER_FILE})")
     print(f"{'=' * 60}")
     
     # Stats
@@ -180,4 +364,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if "--enqueue" in sys.argv:
+        enqueue()
+    elif "--worker" in sys.argv:
+        run_worker()
+    elif "--export" in sys.argv:
+        export()
+    else:
+        main()
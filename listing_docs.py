@@ -0,0 +1,152 @@
+"""
+Listing Detail Documents
+========================
+The details page needs one listing, so it should not have to download the
+whole inventory. write_listing_docs groups listings by id into small JSON
+documents and writes a lookup table mapping id ranges to documents:
+
+    listing/index.json   {"count": 46837, "bucketSize": 32, "buckets": ["100234", "100871", ...]}
+    listing/0.json       {"100234": {...}, "100240": {...}, ...}
+
+Ids are ordered by (length, text), so numeric ids sort numerically. The
+i-th entry of buckets is the first id of document i. details.js finds a
+listing's document by binary search over that list.
+
+Each document holds the published (normalized and scored) listing. Where
+the detail enrichment output (cars_detailed.json) has details for it, they
+fill in the fields the details page shows (VIN, engine, stock number,
+colours, options) that the search record left empty. Nothing else from
+the enrichment record is published; its copy of the search record is from
+when it was enriched and may be stale. A document is only
+rewritten when its content changed, so an incremental run touches (and
+precompress recompresses) only the documents whose listings changed. The
+documents are written by chunked publishes only; an unchunked publish
+removes them, and details.js falls back to the site file. Documents carry
+listedDate instead of daysOnMarket, so that they do not all change every
+day.
+"""
+
+import json
+import glob
+import os
+import shutil
+import sys
+
+from compact_listing import to_json
+from listing_log import ListingLog
+from price_history import day_to_date, today
+
+DOCS_DIR = "listing"
+DETAILED_FILE = "cars_detailed.json"
+BUCKET_SIZE = 32
+INDEX = "index.json"
+# Detail payload key -> the site field it fills in when the search record left it empty
+DETAIL_FIELDS = (
+    ("vin", "vin"),
+    ("localizedEngineDisplayName", "engine"),
+    ("stockNumber", "stockNumber"),
+    ("localizedExteriorColor", "exteriorColor"),
+    ("localizedInteriorColor", "interiorColor"),
+    ("options", "features"),
+)
+EMPTY = (None, "", "Unknown", [], ())
+COMPRESSED = (".gz", ".br")  # precompress.VARIANTS; precompress imports this module
+
+
+def id_order(lid):
+    s = str(lid)
+    return len(s), s
+
+
+def _write_if_changed(path, data):
+    """
+    Write data as JSON unless the file already holds exactly that. Returns
+    True if written. A rewrite removes the file's compressed copies, which
+    would otherwise be served with the old content.
+    """
+    encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=to_json).encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == encoded:
+                return False
+    except OSError:
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(encoded)
+    os.replace(tmp, path)
+    for variant in COMPRESSED:
+        if os.path.exists(path + variant):
+            os.remove(path + variant)
+    return True
+
+
+def apply_details(doc, details):
+    """Fill doc's empty DETAIL_FIELDS from an enrichment payload (top level or its "listing" object)."""
+    sources = [details]
+    if isinstance(details.get("listing"), dict):
+        sources.append(details["listing"])
+    for key, field in DETAIL_FIELDS:
+        if doc.get(field) not in EMPTY:
+            continue
+        for source in sources:
+            if source.get(key) not in EMPTY:
+                doc[field] = source[key]
+                break
+    return doc
+
+
+def write_listing_docs(cars, detailed_file=DETAILED_FILE, out_dir=DOCS_DIR, bucket_size=BUCKET_SIZE):
+    """Write bucketed detail documents for normalized listings, and their lookup table. Returns (listings, documents rewritten)."""
+    detailed = ListingLog(detailed_file).load()
+    day = today()
+    docs = {}
+    for car in cars:
+        lid = car.get('id')
+        if not lid:
+            continue
+        doc = dict(car)
+        # A date, not a count that changes daily; details.js counts the days
+        doc["listedDate"] = day_to_date(day - int(doc.pop("daysOnMarket", 0) or 0))
+        details = (detailed.get(lid) or {}).get("details")
+        if isinstance(details, dict):
+            apply_details(doc, details)
+        docs[str(lid)] = doc
+
+    ids = sorted(docs, key=id_order)
+    os.makedirs(out_dir, exist_ok=True)
+
+    buckets = []
+    rewritten = 0
+    for n, start in enumerate(range(0, len(ids), bucket_size)):
+        bucket = ids[start:start + bucket_size]
+        buckets.append(bucket[0])
+        rewritten += _write_if_changed(os.path.join(out_dir, f"{n}.json"), {lid: docs[lid] for lid in bucket})
+    _write_if_changed(os.path.join(out_dir, INDEX), {
+        "count": len(ids),
+        "bucketSize": bucket_size,
+        "buckets": buckets,
+    })
+    # Documents past the new last bucket
+    for path in glob.glob(os.path.join(out_dir, "*.json")):
+        name = os.path.basename(path)[:-len(".json")]
+        if name.isdigit() and int(name) >= len(buckets):
+            for stale in (path,) + tuple(path + variant for variant in COMPRESSED):
+                if os.path.exists(stale):
+                    os.remove(stale)
+    return len(ids), rewritten
+
+
+def remove_listing_docs(out_dir=DOCS_DIR):
+    """Remove documents (and their compressed copies) left by an earlier chunked publish."""
+    # Only a directory write_listing_docs built; anything else under that name is left alone
+    if os.path.exists(os.path.join(out_dir, INDEX)):
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # The published site file, whose listings are already normalized and scored
+    source = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "cars.min.json"
+    with open(source, 'r', encoding='utf-8') as f:
+        written, rewritten = write_listing_docs(json.load(f))
+    print(f"Wrote {written} listings to {DOCS_DIR}/ ({rewritten} documents changed)")
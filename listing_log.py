@@ -0,0 +1,88 @@
+"""
+Listing Checkpoint Log
+======================
+Checkpointing used to rewrite the whole of cars.json every few hundred new
+listings, so disk I/O grew quadratically with the crawl. ListingLog instead
+appends each new or updated listing to a JSONL log next to the output file
+and only rewrites the output once, when the crawl compacts it at the end.
+Loading replays the log over the last compacted output, so an interrupted
+run loses nothing that was flushed.
+
+Compact on demand with:  python listing_log.py [cars.json]
+"""
+
+import json
+import os
+import sys
+
+from compact_listing import to_json
+
+
+def log_path(output_file):
+    """cars.json -> cars_log.jsonl"""
+    return os.path.splitext(output_file)[0] + "_log.jsonl"
+
+
+class ListingLog:
+    """Append-only JSONL log of listings, compacted into a JSON array file."""
+
+    def __init__(self, output_file, log_file=None):
+        self.output_file = output_file
+        self.log_file = log_file or log_path(output_file)
+        self.appended = 0
+        self._buffer = []
+
+    def load(self):
+        """Return {id: listing} from the compacted output plus any logged records."""
+        listings = {}
+        if os.path.exists(self.output_file):
+            try:
+                with open(self.output_file, 'r', encoding='utf-8') as f:
+                    for item in json.load(f):
+                        if item.get('id'):
+                            listings[item['id']] = item
+            except (OSError, ValueError):
+                pass
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-write
+                    if item.get('id'):
+                        listings[item['id']] = item
+        return listings
+
+    def append(self, listing):
+        """Queue a new or updated listing; it is written on the next flush."""
+        self._buffer.append(listing)
+
+    def flush(self):
+        """Append buffered listings to the log. Returns how many were written."""
+        if not self._buffer:
+            return 0
+        lines = "".join(json.dumps(item, ensure_ascii=False, default=to_json) + "\n" for item in self._buffer)
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        written = len(self._buffer)
+        self.appended += written
+        self._buffer = []
+        return written
+
+    def compact(self, listings, indent=None):
+        """Write every listing to the output file once and truncate the log."""
+        self._buffer = []
+        tmp = self.output_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(list(listings.values()), f, indent=indent, ensure_ascii=False, default=to_json)
+        os.replace(tmp, self.output_file)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        return len(listings)
+
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else "cars.json"
+    log = ListingLog(output)
+    print(f"Compacted {log.compact(log.load())} listings into {output}")
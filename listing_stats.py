@@ -0,0 +1,130 @@
+"""
+Listing Statistics
+==================
+End-of-run statistics shared by the scrapers. One pass over the listings
+pulls out the make, price, year and mileage columns. Everything after
+that is vectorized NumPy: percentiles, fixed-bin histograms and per-make
+medians, which come from a single lexsort over (make, value) rather than
+a loop per make. The facet index builds its price and mileage facets with
+summarize, so the site and the statistics share one implementation.
+
+The result is printed and also written to stats.json.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STATS_FILE = "stats.json"
+PRICE_BIN = 5000
+MILEAGE_BIN = 10000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def columns(listings):
+    """(makes, price, year, mileage) arrays from raw search records; missing numbers are NaN."""
+    makes, prices, years, mileages = [], [], [], []
+    for l in listings:
+        makes.append(l.get("makeName") or "Unknown")
+        prices.append(l.get("price") or np.nan)
+        years.append(l.get("carYear") or np.nan)
+        mileages.append(l.get("mileage") or np.nan)
+    return (np.array(makes, dtype=str), np.array(prices, dtype=float),
+            np.array(years, dtype=float), np.array(mileages, dtype=float))
+
+
+def summarize(values, bin_size):
+    """min/max/mean, percentiles and a histogram (bin i = [binStart + i * bin_size, binStart + (i + 1) * bin_size))."""
+    values = values[values > 0]  # also drops NaN
+    if not values.size:
+        return {"count": 0}
+    start = values.min() // bin_size * bin_size
+    return {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": round(float(values.mean()), 1),
+        "percentiles": dict(zip(map(str, PERCENTILES), np.percentile(values, PERCENTILES).round(1).tolist())),
+        "binStart": float(start),
+        "binSize": bin_size,
+        "histogram": np.bincount(((values - start) // bin_size).astype(int)).tolist(),
+    }
+
+
+def grouped_median(codes, values, groups):
+    """Median of values per group code (NaN where a group has no values)."""
+    keep = values > 0
+    codes, values = codes[keep], values[keep]
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(groups, np.nan)
+    has = counts > 0
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    medians[has] = (values[lo] + values[hi]) / 2
+    return medians
+
+
+def compute_stats(listings):
+    makes, prices, years, mileages = columns(listings)
+    names, codes, counts = np.unique(makes, return_inverse=True, return_counts=True)
+    median_price = grouped_median(codes, prices, names.size)
+    median_mileage = grouped_median(codes, mileages, names.size)
+    by_count = np.argsort(-counts, kind="stable")
+
+    def number(x):
+        return None if np.isnan(x) else float(x)
+
+    return {
+        "total": int(makes.size),
+        "makes": {
+            str(names[i]): {
+                "count": int(counts[i]),
+                "medianPrice": number(median_price[i]),
+                "medianMileage": number(median_mileage[i]),
+            }
+            for i in by_count
+        },
+        "price": summarize(prices, PRICE_BIN),
+        "year": summarize(years, 1),
+        "mileage": summarize(mileages, MILEAGE_BIN),
+    }
+
+
+def print_stats(stats, top=15, indent="  "):
+    total = max(stats["total"], 1)
+    print(f"\n{indent}Top {top} Makes:")
+    for make, s in list(stats["makes"].items())[:top]:
+        median = f", median ${s['medianPrice']:,.0f}" if s["medianPrice"] is not None else ""
+        print(f"{indent}  {make}: {s['count']:,} ({s['count'] / total * 100:.1f}%{median})")
+
+    price, year, mileage = stats["price"], stats["year"], stats["mileage"]
+    if price["count"]:
+        p = price["percentiles"]
+        print(f"\n{indent}Price Range:   ${price['min']:,.0f} - ${price['max']:,.0f}")
+        print(f"{indent}Average Price: ${price['mean']:,.0f}")
+        print(f"{indent}Percentiles:   p5 ${p['5']:,.0f} | p25 ${p['25']:,.0f} | median ${p['50']:,.0f} "
+              f"| p75 ${p['75']:,.0f} | p95 ${p['95']:,.0f}")
+    if year["count"]:
+        print(f"\n{indent}Year Range:    {year['min']:.0f} - {year['max']:.0f} (median {year['percentiles']['50']:.0f})")
+    if mileage["count"]:
+        print(f"\n{indent}Mileage Range: {mileage['min']:,.0f} - {mileage['max']:,.0f} mi")
+        print(f"{indent}Average Miles: {mileage['mean']:,.0f} mi (median {mileage['percentiles']['50']:,.0f})")
+
+
+def write_stats(stats, path=STATS_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp, path)
+
+
+def report(listings, top=15, indent="  ", path=STATS_FILE):
+    """Compute, print and save the statistics for listings. Returns them."""
+    stats = compute_stats(listings)
+    print_stats(stats, top, indent)
+    write_stats(stats, path)
+    return stats
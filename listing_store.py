@@ -0,0 +1,142 @@
+"""
+SQLite Listing Store
+====================
+Optional replacement for the in-memory all_listings dict. Raw listings
+live in a SQLite table keyed by listing id, with indexes on make, year,
+price and mileage; only the set of known ids is held in memory. Writes are
+buffered and upserted in batches, one transaction per batch. cars.json is
+produced from the table by export_json, streaming rows instead of building
+the whole list first.
+
+The store supports the dict operations the scrapers use (in, [], len,
+values), so it can be dropped in for all_listings.
+"""
+
+import json
+import os
+import sqlite3
+
+from compact_listing import to_json
+
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id PRIMARY KEY,
+    make_name TEXT,
+    car_year INTEGER,
+    price REAL,
+    mileage INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_listings_make ON listings (make_name);
+CREATE INDEX IF NOT EXISTS idx_listings_year ON listings (car_year);
+CREATE INDEX IF NOT EXISTS idx_listings_price ON listings (price);
+CREATE INDEX IF NOT EXISTS idx_listings_mileage ON listings (mileage);
+"""
+
+UPSERT = """
+INSERT INTO listings (id, make_name, car_year, price, mileage, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    make_name = excluded.make_name,
+    car_year = excluded.car_year,
+    price = excluded.price,
+    mileage = excluded.mileage,
+    data = excluded.data
+"""
+
+
+def _row(item):
+    return (
+        item['id'],
+        item.get('makeName'),
+        item.get('carYear'),
+        item.get('price'),
+        item.get('mileage'),
+        json.dumps(item, ensure_ascii=False, default=to_json),
+    )
+
+
+class ListingStore:
+    """Listings in SQLite, keyed by id, with batched upserts."""
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        # timeout: inventory_scraper workers write to one store from several processes
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._ids = {row[0] for row in self.conn.execute("SELECT id FROM listings")}
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, lid):
+        return lid in self._ids
+
+    def __setitem__(self, lid, item):
+        self._ids.add(lid)
+        self._pending[lid] = item
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def __getitem__(self, lid):
+        if lid in self._pending:
+            return self._pending[lid]
+        row = self.conn.execute("SELECT data FROM listings WHERE id = ?", (lid,)).fetchone()
+        if row is None:
+            raise KeyError(lid)
+        return json.loads(row[0])
+
+    def get(self, lid, default=None):
+        try:
+            return self[lid]
+        except KeyError:
+            return default
+
+    def upsert_many(self, items):
+        """Insert or update listings in a single transaction. Returns how many were written."""
+        rows = [_row(item) for item in items if item.get('id')]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+        self._ids.update(row[0] for row in rows)
+        return len(rows)
+
+    def flush(self):
+        """Write buffered listings. Returns how many were written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        return self.upsert_many(pending.values())
+
+    def values(self):
+        """Stream every listing from the table."""
+        self.flush()
+        for (data,) in self.conn.execute("SELECT data FROM listings"):
+            yield json.loads(data)
+
+    def export_json(self, path, indent=None):
+        """Write all listings to a JSON array file without materialising the list."""
+        self.flush()
+        tmp = path + ".tmp"
+        sep = ",\n" if indent is not None else ","
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write("[")
+            for i, (data,) in enumerate(self.conn.execute("SELECT data FROM listings")):
+                if i:
+                    f.write(sep)
+                if indent is None:
+                    f.write(data)
+                else:
+                    f.write(json.dumps(json.loads(data), indent=indent, ensure_ascii=False))
+            f.write("]")
+        os.replace(tmp, path)
+        return len(self)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -6,6 +6,8 @@ import requests
 import json
 import time
 
+from listing_stats import report
+
 def scrape_comprehensive(zip_code="77479"):
     """Comprehensive scraper using all available strategies."""
     
@@ -201,19 +203,7 @@ def scrape_comprehensive(zip_code="77479"):
     print(f"{'=' * 60}")
     
     # Stats
-    makes = {}
-    for l in result:
-        m = l.get("makeName", "Unknown")
-        makes[m] = makes.get(m, 0) + 1
-    
-    print("\nTop 10 Makes:")
-    for make, count in sorted(makes.items(), key=lambda x: -x[1])[:10]:
-        print(f"  {make}: {count}")
-    
-    prices = [l.get("price", 0) for l in result if l.get("price", 0) > 0]
-    if prices:
-        print(f"\nPrice: ${min(prices):,.0f} - ${max(prices):,.0f}")
-        print(f"Average: ${sum(prices)/len(prices):,.0f}")
+    report(result, top=10, indent="")
 
 
 if __name__ == "__main__":
@@ -4,14 +4,30 @@ CarGurus Maximum Scraper V2 - Enhanced with Detail Fetching
 1. Exhaustive search using all filter combinations
 2. Detail page scraping for additional info (VIN, features, history, etc.)
 3. Real-time progress monitoring
+4. Concurrent fetching via fetch_engine, paced by a shared adaptive rate limiter
+5. Listings held as compact records of the fields the site uses (--keep-raw keeps full payloads)
 """
 
 import requests
-import json
 import time
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+
+from compact_listing import CompactListing
+from crawl_cursor import CrawlCursor
+from enrichment import DetailEnricher
+from fetch_engine import FetchEngine
+from listing_log import ListingLog
+from listing_stats import STATS_FILE, report
+from listing_store import ListingStore
+from normalize import SITE_FILE, content_hash, publish
+from precompress import COMPRESS
+from query_planner import QueryPlanner, print_plan
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from response_cache import ResponseCache
+from retry_queue import FetchError, RetryQueue
+from yield_tracker import YieldTracker
 
 # Fix encoding and buffering for Windows
 if sys.platform == 'win32':
@@ -22,17 +38,38 @@ def log(msg=""):
     print(msg, flush=True)
 
 # Constants
+SEARCH_URL = "https://www.cargurus.com/Cars/searchResults.action"
 OUTPUT_FILE = "cars.json"
 DETAIL_OUTPUT_FILE = "cars_detailed.json"
 CHECKPOINT_FILE = "scrape_checkpoint_v2.json"
+DEAD_LETTER_FILE = "dead_letters_v2.json"
+LISTING_DB = None  # e.g. "cars.db" to keep listings in SQLite instead of memory
+OUTPUT_INDENT = None if COMPRESS else 2  # --compress exports compact JSON
 TARGET_COUNT = 50000
-DELAY = 0.1  # 100ms delay between requests
-DETAIL_DELAY = 0.2  # 200ms for detail pages
+MAX_IN_FLIGHT = 16  # concurrent search requests
+MAX_REQUESTS_PER_SECOND = 20.0  # adaptive rate limiter ceiling
+CURSOR_EVERY = 100  # requests between cursor checkpoints
+YIELD_WINDOW = 200  # requests in the marginal-yield window
+MIN_YIELD = 0.05  # stop a strategy below this many listings found per request
+ENRICH_DETAILS = True  # fetch detail pages for new/changed listings after the crawl
+DETAIL_IN_FLIGHT = 8  # concurrent detail requests
+DETAIL_REQUESTS_PER_SECOND = 5.0  # separate budget so enrichment never starves the search
 
 # Storage
 all_listings = {}
 request_count = 0
+updated_count = 0  # known listings whose content changed this run
+listing_hashes = {}  # id -> content hash, filled lazily for loaded listings
+seen_this_run = set()  # ids returned by any request this run, for strategy yield and the change feed
 detail_fetch_count = 0
+count_lock = threading.Lock()
+rate_limiter = AdaptiveRateLimiter(rate=5.0, max_rate=MAX_REQUESTS_PER_SECOND)
+detail_rate_limiter = AdaptiveRateLimiter(rate=2.0, max_rate=DETAIL_REQUESTS_PER_SECOND)
+retry_queue = RetryQueue()
+detail_retry_queue = RetryQueue(max_attempts=3)
+listing_log = ListingLog(OUTPUT_FILE)
+cursor = CrawlCursor(CHECKPOINT_FILE)
+store = None
 
 
 def create_session():
@@ -52,96 +89,158 @@ def create_session():
 
 
 def fetch_listings(session, params):
-    """Fetch listings from API."""
+    """Fetch listings from API. Raises FetchError so failures can be retried."""
     global request_count
-    request_count += 1
+    with count_lock:
+        request_count += 1
     
+    rate_limiter.acquire()
     try:
         r = session.get(
-            "https://www.cargurus.com/Cars/searchResults.action",
+            SEARCH_URL,
             params=params,
             timeout=30
         )
-        if r.status_code == 200:
-            data = r.json()
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                return data.get('listings') or data.get('results') or []
-        elif r.status_code == 429:
-            print("  [Rate limited, waiting 5s...]")
-            time.sleep(5)
-        elif r.status_code == 403:
-            print("  [403 Forbidden, waiting 10s...]")
-            time.sleep(10)
-    except requests.exceptions.Timeout:
-        print("  [Timeout, retrying...]")
-    except Exception as e:
-        pass
+    except requests.exceptions.RequestException as e:
+        raise FetchError(f"{type(e).__name__}: {e}")
+    
+    if r.status_code in (429, 403):
+        retry_after = parse_retry_after(r.headers.get("Retry-After"))
+        rate_limiter.on_throttle(retry_after)
+        print(f"  [{r.status_code} - backing off to {rate_limiter.rate:.1f} req/s]")
+    if r.status_code != 200:
+        raise FetchError(f"HTTP {r.status_code}", r.status_code)
+    
+    rate_limiter.on_success()
+    try:
+        data = r.json()
+    except ValueError:
+        raise FetchError("Invalid JSON", r.status_code)
+    if isinstance(data, list):
+        return data
+    elif isinstance(data, dict):
+        return data.get('listings') or data.get('results') or []
     return []
 
 
+# Detail endpoints, fetched concurrently for each listing
+DETAIL_ENDPOINTS = {
+    "listing": "https://www.cargurus.com/Cars/detailListingJson.action",
+    "vdp": "https://www.cargurus.com/Cars/inventorylisting/vdp.action",
+}
+
+
+def fetch_detail_part(session, work):
+    """Fetch one detail endpoint for a (listing, endpoint) pair. Raises FetchError so failures can be retried."""
+    listing, endpoint = work
+    if endpoint == "listing":
+        params = {"listingId": listing['id']}
+        if listing.get('sellerId'):
+            params["sellerId"] = listing['sellerId']
+    else:
+        params = {"listingId": listing['id'], "sourceContext": "carGurusHomePageModel"}
+    
+    detail_rate_limiter.acquire()
+    try:
+        r = session.get(DETAIL_ENDPOINTS[endpoint], params=params, timeout=20)
+    except requests.exceptions.RequestException as e:
+        raise FetchError(f"{type(e).__name__}: {e}")
+    
+    if r.status_code in (429, 403):
+        detail_rate_limiter.on_throttle(parse_retry_after(r.headers.get("Retry-After")))
+    if r.status_code != 200:
+        raise FetchError(f"HTTP {r.status_code}", r.status_code)
+    detail_rate_limiter.on_success()
+    
+    # vdp.action answers with an HTML page when it has no JSON view
+    if endpoint == "vdp" and 'application/json' not in r.headers.get('content-type', ''):
+        return {}
+    try:
+        data = r.json()
+    except ValueError:
+        raise FetchError("Invalid JSON", r.status_code)
+    return data if isinstance(data, dict) else {}
+
+
 def fetch_vehicle_details(session, listing_id, seller_id=None):
     """Fetch additional details for a specific vehicle."""
     global detail_fetch_count
-    detail_fetch_count += 1
+    with count_lock:
+        detail_fetch_count += 1
     
+    listing = {"id": listing_id, "sellerId": seller_id}
     details = {}
-    
-    try:
-        # Try the listing detail endpoint
-        url = f"https://www.cargurus.com/Cars/detailListingJson.action"
-        params = {"listingId": listing_id}
-        if seller_id:
-            params["sellerId"] = seller_id
-        
-        r = session.get(url, params=params, timeout=20)
-        if r.status_code == 200:
-            data = r.json()
-            if isinstance(data, dict):
-                details.update(data)
-    except:
-        pass
-    
-    try:
-        # Try alternate endpoint for more info
-        url2 = f"https://www.cargurus.com/Cars/inventorylisting/vdp.action"
-        params2 = {"listingId": listing_id, "sourceContext": "carGurusHomePageModel"}
-        r2 = session.get(url2, params=params2, timeout=20)
-        if r2.status_code == 200 and 'application/json' in r2.headers.get('content-type', ''):
-            data2 = r2.json()
-            if isinstance(data2, dict):
-                details.update(data2)
-    except:
-        pass
-    
+    for endpoint in DETAIL_ENDPOINTS:
+        try:
+            details.update(fetch_detail_part(session, (listing, endpoint)))
+        except FetchError:
+            pass
     return details
 
 
-def save_progress(listings, filename=OUTPUT_FILE):
-    """Save current progress."""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(list(listings.values()), f, indent=2, ensure_ascii=False)
-    return len(listings)
+def enrich_details(listings):
+    """Fetch detail pages for listings that are new or changed since the last run."""
+    enricher = DetailEnricher(
+        fetch_detail_part, DETAIL_ENDPOINTS, create_session, DETAIL_OUTPUT_FILE,
+        DETAIL_IN_FLIGHT, detail_retry_queue
+    )
+    enricher.load()
+    todo = enricher.pending(listings)
+    print(f"  {len(todo):,} new or changed listings to enrich")
+    if not todo:
+        return enricher
+    enricher.run(todo)
+    enricher.compact()
+    return enricher
+
+
+def save_progress():
+    """Checkpoint listings added since the last save (SQLite store or append-only log)."""
+    if store is not None:
+        return store.flush()
+    return listing_log.flush()
 
 
 def load_existing():
-    """Load existing data."""
-    existing = {}
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                for item in json.load(f):
-                    if item.get('id'):
-                        existing[item['id']] = item
-            print(f"Loaded {len(existing)} existing listings")
-        except:
-            pass
+    """
+    Load existing data: the SQLite store when LISTING_DB is set (importing
+    cars.json and the checkpoint log on first use), otherwise the last
+    compacted output plus the checkpoint log.
+    """
+    global store
+    if LISTING_DB:
+        store = ListingStore(LISTING_DB)
+        if not len(store):
+            store.upsert_many(listing_log.load().values())
+        existing = store
+    else:
+        existing = {lid: CompactListing.from_raw(item) for lid, item in listing_log.load().items()}
+    if existing:
+        print(f"Loaded {len(existing)} existing listings")
     return existing
 
 
+def write_output(changed=True):
+    """Write the final cars.json from the store or the in-memory listings, plus the site file."""
+    if not changed and os.path.exists(OUTPUT_FILE) and os.path.exists(SITE_FILE) \
+            and not os.path.exists(listing_log.log_file):
+        print(f"No new or changed listings; {OUTPUT_FILE} and {SITE_FILE} left as they are")
+        return
+    if store is not None:
+        store.export_json(OUTPUT_FILE, indent=OUTPUT_INDENT)
+    else:
+        listing_log.compact(all_listings, indent=OUTPUT_INDENT)
+    publish(all_listings.values(), seen=seen_this_run)
+
+
+def checkpoint():
+    """Flush new listings, then record the crawl position."""
+    save_progress()
+    cursor.save(retry_queue.export(), {"request_count": request_count, "retried": retry_queue.retried})
+
+
 def main():
-    global all_listings
+    global all_listings, request_count
     
     print("=" * 70)
     print("  CarGurus Maximum Scraper V2 - Enhanced Edition")
@@ -152,10 +251,16 @@ def main():
     all_listings = load_existing()
     initial_count = len(all_listings)
     
-    session = create_session()
     start_time = time.time()
     last_save_count = initial_count
     
+    if cursor.load():
+        request_count = cursor.counters.get("request_count", 0)
+        retry_queue.retried = cursor.counters.get("retried", 0)
+        retry_queue.restore(cursor.dead_letters)
+        print(f"Resuming interrupted crawl at strategy {cursor.strategy} "
+              f"({len(cursor.completed)} requests of it already done)")
+    
     # =========================================================================
     # CONFIGURATION - All filter options
     # =========================================================================
@@ -215,184 +320,244 @@ def main():
     }
     
     def add_listings(listings):
-        """Add new listings to collection."""
-        new_count = 0
+        """
+        Add new listings and replace ones whose content changed. Returns the
+        yield: listings first seen this run, or changed since they were stored.
+        """
+        global updated_count
+        found = 0
         for item in listings:
             lid = item.get('id')
-            if lid and lid not in all_listings:
-                all_listings[lid] = item
-                new_count += 1
-        return new_count
+            if not lid:
+                continue
+            first_seen = lid not in seen_this_run
+            seen_this_run.add(lid)
+            digest = content_hash(item)
+            if lid in all_listings:
+                if lid not in listing_hashes:
+                    listing_hashes[lid] = content_hash(all_listings[lid])
+                if listing_hashes[lid] == digest:
+                    found += first_seen
+                    continue
+                updated_count += 1
+            found += 1
+            item = CompactListing.from_raw(item)
+            all_listings[lid] = item
+            listing_hashes[lid] = digest
+            if store is None:
+                listing_log.append(item)
+        return found
     
     def status_line():
         elapsed = time.time() - start_time
         rate = (len(all_listings) - initial_count) / max(elapsed, 1)
         return f"[{len(all_listings):,} unique | +{rate:.1f}/s | {request_count} reqs]"
     
+    response_cache = ResponseCache()
+    engine = FetchEngine(response_cache.wrap(fetch_listings, SEARCH_URL), create_session, MAX_IN_FLIGHT, retry_queue)
+    
+    def run_strategy(index, param_sets, name=None, progress_every=100):
+        """
+        Fetch a strategy's parameter sets concurrently and merge the results.
+        Strategies and requests completed before an interruption are skipped.
+        A named strategy is cut short once its marginal yield drops below MIN_YIELD;
+        its pending retries are still run before the next strategy starts.
+        """
+        nonlocal last_save_count
+        if not cursor.begin(index):
+            if param_sets:
+                print("  Already completed, skipping")
+            return
+        todo = cursor.remaining(param_sets)
+        if len(todo) < len(param_sets):
+            print(f"  Resuming: {len(param_sets) - len(todo)}/{len(param_sets)} requests already done")
+        strategy = yields.start(name, len(todo)) if name else None
+        done = 0
+        stopped = False
+        for params, listings in engine.map(p for p in todo if not planner.covered(p)):
+            found = add_listings(listings)
+            planner.record(params, len(listings))
+            cursor.mark(params)
+            done += 1
+            if done % progress_every == 0:
+                print(f"  {done}/{len(todo)} requests: {status_line()}")
+            
+            # Save periodically
+            if len(all_listings) - last_save_count >= 500:
+                save_progress()
+                last_save_count = len(all_listings)
+                print(f"  [SAVED {last_save_count:,} listings]")
+            if done % CURSOR_EVERY == 0:
+                checkpoint()
+            if strategy is not None and not strategy.record(found):
+                print(f"  Yield fell to {strategy.window_yield:.3f} found/request over the last "
+                      f"{YIELD_WINDOW} requests, moving on")
+                stopped = True
+                break
+        if stopped:
+            # Settle this strategy's queued retries here, so the next one
+            # neither counts them toward its yield nor marks them as its own
+            for params, listings in engine.map([]):
+                add_listings(listings)
+                planner.record(params, len(listings))
+                cursor.mark(params)
+                done += 1
+        checkpoint()
+        print(f"  Done ({done} requests): {status_line()}")
+    
+    planner = QueryPlanner()
+    yields = YieldTracker(YIELD_WINDOW, MIN_YIELD)
+    
+    # Failed requests carried over from the previous run go first
+    if cursor.strategy == 0:
+        carried_over = retry_queue.load(DEAD_LETTER_FILE)
+        if carried_over:
+            print(f"Retrying {carried_over} failed requests from the previous run")
+    run_strategy(0, [])
+    
     # =========================================================================
     # STRATEGY 1: By Make + Price Range (most effective)
     # =========================================================================
-    print(f"\n{'='*70}")
-    print("[1/6] Strategy: Make + Price Range Combinations")
-    print("=" * 70)
-    
-    for make_id in makes:
-        make_name = make_names.get(make_id, make_id)
-        for min_p, max_p in price_ranges:
-            params = {
-                **base_params,
-                "zip": "77479",
-                "distance": 500,
-                "makeId": make_id,
-                "minPrice": min_p,
-                "maxPrice": max_p
-            }
-            new = add_listings(fetch_listings(session, params))
-            time.sleep(DELAY)
-        
-        print(f"  {make_name}: {status_line()}")
-        
-        # Save periodically
-        if len(all_listings) - last_save_count >= 500:
-            save_progress(all_listings)
-            last_save_count = len(all_listings)
-            print(f"  [SAVED {last_save_count:,} listings]")
+    planner.add("Make + Price Range Combinations", [
+        {
+            **base_params,
+            "zip": "77479",
+            "distance": 500,
+            "makeId": make_id,
+            "minPrice": min_p,
+            "maxPrice": max_p
+        }
+        for make_id in makes
+        for min_p, max_p in price_ranges
+    ])
     
     # =========================================================================
     # STRATEGY 2: By Price + Mileage (catches cars missed by make)
     # =========================================================================
-    print(f"\n{'='*70}")
-    print("[2/6] Strategy: Price + Mileage Combinations")
-    print("=" * 70)
-    
-    for min_p, max_p in price_ranges:
-        for min_m, max_m in mileage_ranges:
-            params = {
-                **base_params,
-                "zip": "77479",
-                "distance": 500,
-                "minPrice": min_p,
-                "maxPrice": max_p,
-                "minMileage": min_m,
-                "maxMileage": max_m
-            }
-            add_listings(fetch_listings(session, params))
-            time.sleep(DELAY)
-        
-        if min_p % 10000 == 0:
-            print(f"  Price ${min_p:,}-${max_p:,}: {status_line()}")
-    
-    if len(all_listings) - last_save_count >= 500:
-        save_progress(all_listings)
-        last_save_count = len(all_listings)
-        print(f"  [SAVED {last_save_count:,} listings]")
+    planner.add("Price + Mileage Combinations", [
+        {
+            **base_params,
+            "zip": "77479",
+            "distance": 500,
+            "minPrice": min_p,
+            "maxPrice": max_p,
+            "minMileage": min_m,
+            "maxMileage": max_m
+        }
+        for min_p, max_p in price_ranges
+        for min_m, max_m in mileage_ranges
+    ])
     
     # =========================================================================
     # STRATEGY 3: By Body Type + Year
     # =========================================================================
-    print(f"\n{'='*70}")
-    print("[3/6] Strategy: Body Type + Year Combinations")
-    print("=" * 70)
-    
-    for body in body_types:
-        for year in years:
-            params = {
-                **base_params,
-                "zip": "77479",
-                "distance": 500,
-                "bodyTypeGroupId": body,
-                "startYear": year,
-                "endYear": year
-            }
-            add_listings(fetch_listings(session, params))
-            time.sleep(DELAY)
-        print(f"  Body {body}: {status_line()}")
-    
-    if len(all_listings) - last_save_count >= 500:
-        save_progress(all_listings)
-        last_save_count = len(all_listings)
-        print(f"  [SAVED {last_save_count:,} listings]")
+    planner.add("Body Type + Year Combinations", [
+        {
+            **base_params,
+            "zip": "77479",
+            "distance": 500,
+            "bodyTypeGroupId": body,
+            "startYear": year,
+            "endYear": year
+        }
+        for body in body_types
+        for year in years
+    ])
     
     # =========================================================================
     # STRATEGY 4: Multiple ZIP Codes
     # =========================================================================
-    print(f"\n{'='*70}")
-    print("[4/6] Strategy: Multiple ZIP Codes")
-    print("=" * 70)
-    
-    for zc in zip_codes:
-        for sort_type in sort_types:
-            params = {
-                **base_params,
-                "zip": zc,
-                "distance": 100,
-                "sortType": sort_type
-            }
-            add_listings(fetch_listings(session, params))
-            time.sleep(DELAY)
-        print(f"  ZIP {zc}: {status_line()}")
-    
-    if len(all_listings) - last_save_count >= 500:
-        save_progress(all_listings)
-        last_save_count = len(all_listings)
-        print(f"  [SAVED {last_save_count:,} listings]")
+    planner.add("Multiple ZIP Codes", [
+        {
+            **base_params,
+            "zip": zc,
+            "distance": 100,
+            "sortType": sort_type
+        }
+        for zc in zip_codes
+        for sort_type in sort_types
+    ])
     
     # =========================================================================
     # STRATEGY 5: Year + Price (by decade)
     # =========================================================================
-    print(f"\n{'='*70}")
-    print("[5/6] Strategy: Year + Price Combinations")
-    print("=" * 70)
-    
-    for year in years:
-        for min_p, max_p in price_ranges[::2]:  # Every other price range
-            params = {
-                **base_params,
-                "zip": "77479",
-                "distance": 500,
-                "startYear": year,
-                "endYear": year,
-                "minPrice": min_p,
-                "maxPrice": max_p
-            }
-            add_listings(fetch_listings(session, params))
-            time.sleep(DELAY)
-        
-        if year % 5 == 0:
-            print(f"  Year {year}: {status_line()}")
-    
-    if len(all_listings) - last_save_count >= 500:
-        save_progress(all_listings)
-        last_save_count = len(all_listings)
-        print(f"  [SAVED {last_save_count:,} listings]")
+    planner.add("Year + Price Combinations", [
+        {
+            **base_params,
+            "zip": "77479",
+            "distance": 500,
+            "startYear": year,
+            "endYear": year,
+            "minPrice": min_p,
+            "maxPrice": max_p
+        }
+        for year in years
+        for min_p, max_p in price_ranges[::2]  # Every other price range
+    ])
     
     # =========================================================================
     # STRATEGY 6: Pagination through large result sets
     # =========================================================================
+    # All offsets are planned up front; pages past the end of a complete answer are skipped
+    planner.add("Pagination Through Results", [
+        {
+            **base_params,
+            "zip": "77479",
+            "distance": 500,
+            "sortType": sort_type,
+            "offset": offset
+        }
+        for sort_type in sort_types
+        for offset in range(0, 1000, 100)
+    ])
+    
+    # =========================================================================
+    # EXECUTE THE PLAN
+    # =========================================================================
+    plan = planner.build()
     print(f"\n{'='*70}")
-    print("[6/6] Strategy: Pagination Through Results")
+    print("  Request Plan")
     print("=" * 70)
+    print_plan(plan)
     
-    for sort_type in sort_types:
-        for offset in range(0, 1000, 100):
-            params = {
-                **base_params,
-                "zip": "77479",
-                "distance": 500,
-                "sortType": sort_type,
-                "offset": offset
-            }
-            listings = fetch_listings(session, params)
-            if not listings:
-                break
+    for i, step in enumerate(plan, 1):
+        print(f"\n{'='*70}")
+        print(f"[{i}/{len(plan)}] Strategy: {step.name}")
+        print("=" * 70)
+        run_strategy(i, step.params, step.name)
+    
+    # =========================================================================
+    # DEAD-LETTER REPLAY
+    # =========================================================================
+    # Not checkpointed: if interrupted, the resumed run replays the dead
+    # letters saved at the end of strategy 6
+    replayed = retry_queue.requeue_dead_letters()
+    if replayed:
+        print(f"\nReplaying {replayed} dead-lettered requests...")
+        for params, listings in engine.map([]):
             add_listings(listings)
-            time.sleep(DELAY)
-        print(f"  Sort {sort_type}: {status_line()}")
+        print(f"  Done: {status_line()}")
+    failed = retry_queue.save(DEAD_LETTER_FILE)
+    
+    save_progress()
+    
+    # =========================================================================
+    # DETAIL ENRICHMENT
+    # =========================================================================
+    # Before the final save, so the published listing documents carry the new details
+    enricher = None
+    if ENRICH_DETAILS:
+        print(f"\n{'='*70}")
+        print("  Detail Enrichment")
+        print("=" * 70)
+        enricher = enrich_details(all_listings.values())
     
     # =========================================================================
     # FINAL SAVE
     # =========================================================================
-    save_progress(all_listings)
+    enriched = enricher.enriched if enricher is not None else 0
+    write_output(changed=len(all_listings) > initial_count or updated_count > 0 or enriched > 0)
+    cursor.clear()
     elapsed = time.time() - start_time
     
     print(f"\n{'='*70}")
@@ -400,49 +565,38 @@ def main():
     print("=" * 70)
     print(f"\n  Total Unique Vehicles: {len(all_listings):,}")
     print(f"  New This Session:      {len(all_listings) - initial_count:,}")
+    print(f"  Updated This Session:  {updated_count:,}")
     print(f"  Total Requests:        {request_count:,}")
+    print(f"  Skipped (covered):     {planner.skipped:,}")
+    print(f"  Cache Hits:            {response_cache.hits:,}" + (" (--refresh)" if response_cache.bypass else ""))
+    print(f"  Retried Requests:      {retry_queue.retried:,}")
+    if failed:
+        print(f"  Still Failing:         {failed:,} (saved to {DEAD_LETTER_FILE})")
+    if enricher is not None:
+        print(f"  Details Fetched:       {enricher.enriched:,}")
+        if enricher.incomplete:
+            print(f"  Details Incomplete:    {enricher.incomplete:,} (retried next run)")
     print(f"  Time Elapsed:          {elapsed:.1f}s ({elapsed/60:.1f} min)")
     print(f"  Rate:                  {(len(all_listings) - initial_count)/max(elapsed,1):.1f} vehicles/s")
     
+    print(f"\n{'='*70}")
+    print("  STRATEGY YIELD")
+    print("=" * 70)
+    yields.print_report()
+    
     # Statistics
     print(f"\n{'='*70}")
     print("  STATISTICS")
     print("=" * 70)
     
-    make_counts = {}
-    prices = []
-    years_list = []
-    mileages = []
-    
-    for car in all_listings.values():
-        make = car.get("makeName", "Unknown")
-        make_counts[make] = make_counts.get(make, 0) + 1
-        
-        if car.get("price"):
-            prices.append(car["price"])
-        if car.get("carYear"):
-            years_list.append(car["carYear"])
-        if car.get("mileage"):
-            mileages.append(car["mileage"])
-    
-    print("\n  Top 15 Makes:")
-    for make, count in sorted(make_counts.items(), key=lambda x: -x[1])[:15]:
-        pct = count / len(all_listings) * 100
-        print(f"    {make}: {count:,} ({pct:.1f}%)")
-    
-    if prices:
-        print(f"\n  Price Range:   ${min(prices):,.0f} - ${max(prices):,.0f}")
-        print(f"  Average Price: ${sum(prices)/len(prices):,.0f}")
-    
-    if years_list:
-        print(f"\n  Year Range:    {min(years_list)} - {max(years_list)}")
-    
-    if mileages:
-        print(f"\n  Mileage Range: {min(mileages):,} - {max(mileages):,} mi")
-        print(f"  Average Miles: {sum(mileages)/len(mileages):,.0f} mi")
+    report(all_listings.values())
     
     print(f"\n{'='*70}")
     print(f"  Data saved to: {OUTPUT_FILE}")
+    print(f"  Site file:     {SITE_FILE}")
+    print(f"  Statistics:    {STATS_FILE}")
+    if enricher is not None:
+        print(f"  Details saved to: {DETAIL_OUTPUT_FILE}")
     print("=" * 70)
 
 
@@ -4,24 +4,41 @@ Uses exhaustive filter combinations with rate limiting
 """
 
 import requests
-import json
 import time
-import os
 import sys
 
+from crawl_cursor import CrawlCursor
+from listing_log import ListingLog
+from listing_stats import report
+from normalize import SITE_FILE, publish
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from response_cache import ResponseCache
+from retry_queue import FetchError, RetryQueue
+from yield_tracker import YieldTracker
+
 # Fix encoding for Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
 # Constants
+SEARCH_URL = "https://www.cargurus.com/Cars/searchResults.action"
 OUTPUT_FILE = "cars.json"
 CHECKPOINT_FILE = "scrape_checkpoint.json"
+DEAD_LETTER_FILE = "dead_letters_mega.json"
 TARGET_COUNT = 50000
-DELAY = 0.1  # 100ms delay between requests
+MAX_REQUESTS_PER_SECOND = 10.0  # adaptive rate limiter ceiling
+YIELD_WINDOW = 200  # requests in the marginal-yield window
+MIN_YIELD = 0.05  # stop a strategy below this many new listings per request
 
 # Storage
 all_listings = {}
+seen_this_run = set()  # ids returned by this run's requests, for the change feed
 request_count = 0
+rate_limiter = AdaptiveRateLimiter(rate=5.0, max_rate=MAX_REQUESTS_PER_SECOND)
+retry_queue = RetryQueue()
+response_cache = ResponseCache()
+listing_log = ListingLog(OUTPUT_FILE)
+cursor = CrawlCursor(CHECKPOINT_FILE)
 
 
 def get_session():
@@ -38,46 +55,78 @@ def get_session():
 
 
 def fetch(session, params):
-    """Fetch listings."""
+    """Fetch listings. Raises FetchError so failures can be retried."""
     global request_count
     request_count += 1
     
+    rate_limiter.acquire()
+    try:
+        r = session.get(SEARCH_URL, params=params, timeout=20)
+    except requests.exceptions.RequestException as e:
+        raise FetchError(f"{type(e).__name__}: {e}")
+    if r.status_code in (429, 403):
+        rate_limiter.on_throttle(parse_retry_after(r.headers.get("Retry-After")))
+    if r.status_code != 200:
+        raise FetchError(f"HTTP {r.status_code}", r.status_code)
+    rate_limiter.on_success()
+    try:
+        data = r.json()
+    except ValueError:
+        raise FetchError("Invalid JSON", r.status_code)
+    return data if isinstance(data, list) else (data.get('listings') or data.get('results') or [])
+
+
+cached_fetch = response_cache.wrap(fetch, SEARCH_URL)
+
+
+def try_fetch(session, params):
+    """Fetch listings, queueing the request for retry instead of raising."""
     try:
-        r = session.get("https://www.cargurus.com/Cars/searchResults.action", params=params, timeout=20)
-        if r.status_code == 200:
-            data = r.json()
-            return data if isinstance(data, list) else (data.get('listings') or data.get('results') or [])
-        elif r.status_code == 429:
-            time.sleep(3)
-        elif r.status_code == 403:
-            time.sleep(5)
-    except:
-        pass
-    return []
-
-
-def save():
-    """Save current progress."""
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(all_listings.values()), f)
+        listings = cached_fetch(session, params)
+    except FetchError as e:
+        retry_queue.record(params, e)
+        return []
+    cursor.mark(params)
+    return listings
+
+
+def add(listings):
+    """Add new listings; returns how many were new."""
+    new = 0
+    for l in listings:
+        if l.get('id'):
+            seen_this_run.add(l['id'])
+        if l.get('id') and l['id'] not in all_listings:
+            all_listings[l['id']] = l
+            listing_log.append(l)
+            new += 1
+    return new
+
+
+def retry_failed(session):
+    """Work through the retry queue until every item succeeds or is dead-lettered."""
+    for params, listings in retry_queue.drain(lambda params: cached_fetch(session, params)):
+        cursor.mark(params)
+        add(listings)
+
+
+def save(batch=0):
+    """Checkpoint new listings to the append-only log, then the crawl position."""
+    listing_log.flush()
+    cursor.save(retry_queue.export(), {"request_count": request_count, "retried": retry_queue.retried, "batch": batch})
     return len(all_listings)
 
 
 def load():
-    """Load existing data."""
+    """Load existing data (last compacted output plus the checkpoint log)."""
     global all_listings
-    if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                for l in json.load(f):
-                    if l.get('id'):
-                        all_listings[l['id']] = l
-            print(f"Loaded {len(all_listings)} existing listings")
-        except:
-            pass
+    all_listings = listing_log.load()
+    if all_listings:
+        print(f"Loaded {len(all_listings)} existing listings")
 
 
 def main():
+    global request_count
     print("=" * 60)
     print("CarGurus MEGA Scraper")
     print("=" * 60)
@@ -88,6 +137,20 @@ def main():
     start = time.time()
     last_save = initial
     
+    batch = 0
+    if cursor.load():
+        request_count = cursor.counters.get("request_count", 0)
+        retry_queue.retried = cursor.counters.get("retried", 0)
+        batch = cursor.counters.get("batch", 0)
+        retry_queue.restore(cursor.dead_letters)
+        print(f"Resuming interrupted crawl at strategy {cursor.strategy} ({len(cursor.completed)} requests of it done)")
+    
+    if cursor.begin(0):
+        carried_over = retry_queue.load(DEAD_LETTER_FILE)
+        if carried_over:
+            print(f"Retrying {carried_over} failed requests from the previous run")
+            retry_failed(session)
+    
     # All makes
     makes = [
         "m7", "m6", "m3", "m1", "m10", "m41", "m47", "m32", "m21", "m17",
@@ -114,113 +177,128 @@ def main():
     
     base = {"zip": "77479", "inventorySearchWidgetType": "AUTO", "distance": 500, "maxResults": 100}
     
-    batch = 0
+    yields = YieldTracker(YIELD_WINDOW, MIN_YIELD)
     total_batches = len(makes) * len(prices) + len(prices) * len(miles) + len(bodies) * len(years)
     
     # Strategy 1: Make + Price
-    print("\n[1/3] Scraping by Make + Price...")
-    for make in makes:
-        for min_p, max_p in prices:
-            params = {**base, "makeId": make, "minPrice": min_p, "maxPrice": max_p}
-            for l in fetch(session, params):
-                if l.get('id') and l['id'] not in all_listings:
-                    all_listings[l['id']] = l
-            
-            batch += 1
-            if batch % 100 == 0:
-                n = len(all_listings)
-                elapsed = time.time() - start
-                print(f"  Batch {batch}/{total_batches}: {n} listings ({(n-initial)/max(elapsed,1):.1f}/s)")
+    if cursor.begin(1):
+        print("\n[1/3] Scraping by Make + Price...")
+        strategy = yields.start("Make + Price", len(makes) * len(prices))
+        for make in makes:
+            for min_p, max_p in prices:
+                params = {**base, "makeId": make, "minPrice": min_p, "maxPrice": max_p}
+                if cursor.is_done(params):
+                    continue
+                if not strategy.record(add(try_fetch(session, params))):
+                    print(f"  Yield fell to {strategy.window_yield:.3f} new/request, moving on")
+                    break
                 
-            if len(all_listings) - last_save >= 1000:
-                save()
-                last_save = len(all_listings)
-                print(f"  [Saved {last_save}]")
-            
-            time.sleep(DELAY)
-            
-            if len(all_listings) >= TARGET_COUNT:
+                batch += 1
+                if batch % 100 == 0:
+                    n = len(all_listings)
+                    elapsed = time.time() - start
+                    print(f"  Batch {batch}/{total_batches}: {n} listings ({(n-initial)/max(elapsed,1):.1f}/s)")
+                    save(batch)
+                
+                if len(all_listings) - last_save >= 1000:
+                    save(batch)
+                    last_save = len(all_listings)
+                    print(f"  [Saved {last_save}]")
+                
+                if len(all_listings) >= TARGET_COUNT:
+                    break
+            if len(all_listings) >= TARGET_COUNT or strategy.stopped_early:
                 break
-        if len(all_listings) >= TARGET_COUNT:
-            break
+    
+        retry_failed(session)
     
     # Strategy 2: Price + Mileage
-    if len(all_listings) < TARGET_COUNT:
+    if len(all_listings) < TARGET_COUNT and cursor.begin(2):
         print("\n[2/3] Scraping by Price + Mileage...")
+        strategy = yields.start("Price + Mileage", len(prices) * len(miles))
         for min_p, max_p in prices:
             for min_m, max_m in miles:
                 params = {**base, "minPrice": min_p, "maxPrice": max_p, "minMileage": min_m, "maxMileage": max_m}
-                for l in fetch(session, params):
-                    if l.get('id') and l['id'] not in all_listings:
-                        all_listings[l['id']] = l
+                if cursor.is_done(params):
+                    continue
+                if not strategy.record(add(try_fetch(session, params))):
+                    print(f"  Yield fell to {strategy.window_yield:.3f} new/request, moving on")
+                    break
                 
                 batch += 1
                 if batch % 100 == 0:
                     n = len(all_listings)
                     print(f"  Batch {batch}: {n} listings")
+                    save(batch)
                     
                 if len(all_listings) - last_save >= 1000:
-                    save()
+                    save(batch)
                     last_save = len(all_listings)
                     print(f"  [Saved {last_save}]")
                 
-                time.sleep(DELAY)
-                
                 if len(all_listings) >= TARGET_COUNT:
                     break
-            if len(all_listings) >= TARGET_COUNT:
+            if len(all_listings) >= TARGET_COUNT or strategy.stopped_early:
                 break
     
+        retry_failed(session)
+    
     # Strategy 3: Body + Year
-    if len(all_listings) < TARGET_COUNT:
+    if len(all_listings) < TARGET_COUNT and cursor.begin(3):
         print("\n[3/3] Scraping by Body Type + Year...")
+        strategy = yields.start("Body Type + Year", len(bodies) * len(years))
         for body in bodies:
             for year in years:
                 params = {**base, "bodyTypeGroupId": body, "startYear": year, "endYear": year}
-                for l in fetch(session, params):
-                    if l.get('id') and l['id'] not in all_listings:
-                        all_listings[l['id']] = l
+                if cursor.is_done(params):
+                    continue
+                if not strategy.record(add(try_fetch(session, params))):
+                    print(f"  Yield fell to {strategy.window_yield:.3f} new/request, moving on")
+                    break
                 
                 batch += 1
                 if batch % 50 == 0:
                     n = len(all_listings)
                     print(f"  Batch {batch}: {n} listings")
+                    save(batch)
                     
                 if len(all_listings) - last_save >= 1000:
-                    save()
+                    save(batch)
                     last_save = len(all_listings)
                     print(f"  [Saved {last_save}]")
                 
-                time.sleep(DELAY)
-                
                 if len(all_listings) >= TARGET_COUNT:
                     break
-            if len(all_listings) >= TARGET_COUNT:
+            if len(all_listings) >= TARGET_COUNT or strategy.stopped_early:
                 break
     
+        retry_failed(session)
+    
+    # Dead-letter replay
+    replayed = retry_queue.requeue_dead_letters()
+    if replayed:
+        print(f"\nReplaying {replayed} dead-lettered requests...")
+        retry_failed(session)
+    failed = retry_queue.save(DEAD_LETTER_FILE)
+    
     # Final save
-    final = save()
+    final = listing_log.compact(all_listings)
+    publish(all_listings.values(), seen=seen_this_run)
+    cursor.clear()
     elapsed = time.time() - start
     
     print(f"\n{'=' * 60}")
-    print(f"DONE! {final} unique listings in {elapsed:.1f}s")
+    print(f"DONE! {final} unique listings in {elapsed:.1f}s (site file: {SITE_FILE})")
+    print(f"{request_count} requests, {response_cache.hits} served from cache")
+    if failed:
+        print(f"{failed} requests still failing after {retry_queue.retried} retries (saved to {DEAD_LETTER_FILE})")
     print(f"{'=' * 60}")
     
+    print("\nStrategy yield:")
+    yields.print_report()
+    
     # Stats
-    makes_count = {}
-    prices_list = []
-    for l in all_listings.values():
-        m = l.get("makeName", "?")
-        makes_count[m] = makes_count.get(m, 0) + 1
-        if l.get("price"):
-            prices_list.append(l["price"])
-    
-    print("\nTop Makes:")
-    for m, c in sorted(makes_count.items(), key=lambda x: -x[1])[:10]:
-        print(f"  {m}: {c}")
-    
-    if prices_list:
-        print(f"\nPrice: ${min(prices_list):,.0f} - ${max(prices_list):,.0f}")
+    report(all_listings.values(), top=10, indent="")
 
 
 if __name__ == "__main__":
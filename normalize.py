@@ -0,0 +1,211 @@
+"""
+Site Normalization
+==================
+Maps raw CarGurus search records onto the schema the front end renders
+(the same one scraper.generate_sample_listings produces), field for field
+as normalizeCar in app.js does, and drops every other raw field.
+
+The crawl output (cars.json) keeps the raw records, because the scrapers
+resume and deduplicate from it. The site loads SITE_FILE instead. It is
+smaller to download, and its records are already normalized, so
+normalizeCar passes them through unchanged. Each publish records prices in
+the price history store (see price_history), and listings whose price has
+moved carry their priceHistory. Every listing gets a fairValue, and a
+model deal score where CarGurus gave none (see valuation). daysOnMarket is
+counted from the day each listing was listed, kept in LISTED_FILE, because
+the stored search record is only refreshed when its content changes. The
+facet index (see facets) and the change feed against the previous publish
+(see snapshot_diff) are written with it.
+
+With --chunked, publish also writes the paged chunks and manifest (see
+site_chunks) and the per-listing detail documents (see listing_docs).
+Without it, shards from an earlier chunked publish are removed.
+With --compress, every published file also gets .gz/.br copies (see
+precompress).
+
+Rebuild on demand with:  python normalize.py [cars.json] [--chunked] [--compress]
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+from compact_listing import to_json
+from facets import FACETS_FILE, build_facets, write_facets
+from listing_docs import remove_listing_docs, write_listing_docs
+from precompress import COMPRESS, SHARD_GLOBS, discard_variants, precompress, print_sizes, site_files
+from price_history import HISTORY_FILE, PriceHistory, today
+from site_chunks import CHUNKED, remove_chunks, write_chunks
+from snapshot_diff import CHANGES_FILE, write_changes
+from valuation import score_listings
+
+SITE_FILE = "cars.min.json"
+LISTED_FILE = "listed_days.json"  # id -> day listed (days since 1970-01-01)
+# Left out of the content hash: added at publish time (priceHistory, fairValue),
+# or changing every day without the listing changing (daysOnMarket)
+HASH_EXCLUDE = ("priceHistory", "fairValue", "daysOnMarket")
+DEFAULT_IMAGE = "https://images.unsplash.com/photo-1492144534655-ae79c964c9d7?w=800"
+
+DEAL_RATINGS = {
+    "GREAT_PRICE": "Great Deal",
+    "GOOD_PRICE": "Good Deal",
+    "FAIR_PRICE": "Fair Deal",
+    "HIGH_PRICE": "High Price",
+    "OVERPRICED": "Overpriced",
+}
+
+
+def format_deal_rating(rating):
+    """GOOD_PRICE -> Good Deal (formatDealRating in app.js)."""
+    if not rating:
+        return "No Price Analysis"
+    if rating in DEAL_RATINGS:
+        return DEAL_RATINGS[rating]
+    return re.sub(r"\b\w", lambda m: m.group().upper(), rating.replace("_", " "))
+
+
+def is_raw(listing):
+    return bool(listing.get("listingTitle") or listing.get("makeName"))
+
+
+def normalize_car(raw, index=0):
+    """One raw search record in the site schema; already-normalized records pass through."""
+    if not is_raw(raw):
+        return raw
+    picture = raw.get("originalPictureData") or {}
+    return {
+        "id": raw.get("id") or index,
+        "year": raw.get("carYear") or 2020,
+        "make": raw.get("makeName") or "Unknown",
+        "model": raw.get("modelName") or "Unknown",
+        "trim": raw.get("trimName") or "",
+        "price": raw.get("price") or 0,
+        "mileage": raw.get("mileage") or 0,
+        "exteriorColor": raw.get("localizedExteriorColor") or raw.get("exteriorColorName") or "Unknown",
+        "interiorColor": raw.get("localizedInteriorColor") or raw.get("interiorColor") or "Unknown",
+        "transmission": raw.get("localizedTransmission") or "Automatic",
+        "fuelType": raw.get("localizedFuelType") or "Gasoline",
+        "drivetrain": raw.get("localizedDriveTrain") or raw.get("driveTrain") or "FWD",
+        "bodyType": raw.get("bodyTypeName") or "Sedan",
+        "engine": raw.get("localizedEngineDisplayName") or "",
+        "imageUrl": picture.get("url") or DEFAULT_IMAGE,
+        "dealRating": format_deal_rating(raw.get("dealRating")),
+        "dealScore": raw.get("dealScore") or 0,
+        "priceDifferential": raw.get("priceDifferential") or 0,
+        "dealer": {
+            "name": raw.get("serviceProviderName") or raw.get("dealerName") or "Local Dealer",
+            "rating": raw.get("sellerRating") or 4.0,
+            "reviews": raw.get("reviewCount") or 0,
+            "phone": raw.get("phoneNumberString") or "",
+        },
+        "location": {
+            "city": raw.get("sellerCity") or "Houston, TX",
+            "state": raw.get("sellerRegion") or "TX",
+            "zip": raw.get("sellerPostalCode") or "77479",
+            "distance": raw.get("distance") or 0,
+        },
+        "features": raw.get("options") or [],
+        "vin": raw.get("vin") or "",
+        "stockNumber": raw.get("stockNumber") or "",
+        "daysOnMarket": raw.get("daysOnMarket") or 0,
+    }
+
+
+def content_hash(listing):
+    """Stable hash of the fields the site shows; unchanged listings hash the same on every crawl."""
+    car = normalize_car(listing)
+    car = {key: value for key, value in car.items() if key not in HASH_EXCLUDE}
+    # Distance is measured from the zip a query searched from, not a property of the listing
+    if isinstance(car.get("location"), dict):
+        car["location"] = {key: value for key, value in car["location"].items() if key != "distance"}
+    encoded = json.dumps(car, sort_keys=True, ensure_ascii=False, default=to_json).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def add_price_history(cars, history_file=HISTORY_FILE):
+    """Record this crawl's prices and attach priceHistory to listings whose price has changed."""
+    history = PriceHistory(history_file)
+    history.load()
+    for car in cars:
+        history.record(car["id"], car.get("price"))
+        points = history.history(car["id"])
+        if len(points) > 1:
+            car["priceHistory"] = points
+    history.save()
+
+
+def add_days_on_market(cars, listed_file=LISTED_FILE, day=None):
+    """
+    Set daysOnMarket from the day each listing was listed: the earliest of the
+    stored day and today minus the crawl's daysOnMarket, which is as old as
+    the record it came from.
+    """
+    day = today() if day is None else day
+    try:
+        with open(listed_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    listed = {}
+    for car in cars:
+        lid = str(car["id"])
+        reported = day - int(car.get("daysOnMarket") or 0)
+        listed[lid] = min(previous.get(lid, reported), reported)
+        car["daysOnMarket"] = day - listed[lid]
+    tmp = listed_file + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(listed, f, separators=(",", ":"))
+    os.replace(tmp, listed_file)
+
+
+def read_published(path=SITE_FILE):
+    """{id: listing} from the last published site file; empty if there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cars = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {car["id"]: car for car in cars if isinstance(car, dict) and car.get("id")}
+
+
+def publish(listings, output_file=SITE_FILE, chunked=CHUNKED, compress=COMPRESS, seen=None):
+    """
+    Write the normalized site file (and chunks) from raw listings. seen holds
+    the ids the crawl returned, for the change feed. Returns how many were written.
+    """
+    listings = list(listings)
+    cars = [normalize_car(item, i) for i, item in enumerate(listings)]
+    score_listings(cars, previous=read_published(output_file))
+    add_price_history(cars)
+    add_days_on_market(cars)
+    tmp = output_file + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cars, f, ensure_ascii=False, separators=(",", ":"), default=to_json)
+    os.replace(tmp, output_file)
+    write_facets(build_facets(cars))
+    changes = write_changes(cars, seen)
+    if changes["previousAt"]:
+        print(f"  Since last publish: {len(changes['new']):,} new, {len(changes['removed']):,} removed, "
+              f"{len(changes['repriced']):,} repriced")
+    if chunked:
+        write_chunks(cars)
+        write_listing_docs(cars)
+    else:
+        # The site prefers the shards, so stale ones would hide this publish
+        remove_chunks()
+        remove_listing_docs()
+    published = [output_file, FACETS_FILE, CHANGES_FILE]
+    if compress:
+        print_sizes(precompress(site_files(published + list(SHARD_GLOBS))))
+    else:
+        discard_variants(published)
+    return len(cars)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "cars.json"
+    with open(source, 'r', encoding='utf-8') as f:
+        raw_listings = json.load(f)
+    print(f"Published {publish(raw_listings)} listings to {SITE_FILE}")
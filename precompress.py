@@ -0,0 +1,107 @@
+"""
+Precompressed Artefacts
+=======================
+Writes .gz (level 9) and .br (quality 11) copies of the published site
+files, so they can be served precompressed. Files are compressed in a
+process pool, so the chunk and listing-document shards are spread over
+all cores. A copy that is newer than its source is kept as it is, so files
+an incremental publish left untouched are not compressed again. Brotli is
+optional; without the brotli package only .gz copies are written.
+
+Enable with --compress on any scraper that publishes the site file, or run
+on demand with:  python precompress.py
+"""
+
+import glob
+import gzip
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from facets import FACETS_FILE
+from listing_docs import DOCS_DIR
+from site_chunks import CHUNK_DIR
+from snapshot_diff import CHANGES_FILE
+
+COMPRESS = "--compress" in sys.argv
+VARIANTS = (".gz", ".br")
+SHARD_GLOBS = (f"{CHUNK_DIR}/*.json", f"{CHUNK_DIR}/make/*.json", f"{DOCS_DIR}/*.json")
+SITE_GLOBS = ("cars.min.json", FACETS_FILE, CHANGES_FILE) + SHARD_GLOBS
+
+
+def site_files(patterns=SITE_GLOBS):
+    return sorted(path for pattern in patterns for path in glob.glob(pattern))
+
+
+def _fresh(path, variant):
+    return os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(path)
+
+
+def compress_file(path):
+    """Write path.gz (and path.br) unless they are up to date. Returns (path, {variant: bytes})."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {"": len(data)}
+    codecs = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]  # mtime=0: same input, same bytes
+    if brotli is not None:
+        codecs.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for ext, compress in codecs:
+        variant = path + ext
+        if not _fresh(path, variant):
+            with open(variant, 'wb') as f:
+                f.write(compress(data))
+        sizes[ext] = os.path.getsize(variant)
+    return path, sizes
+
+
+def discard_variants(paths, variants=VARIANTS):
+    """Remove compressed copies that would be stale after the files were rewritten."""
+    for path in paths:
+        for ext in variants:
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+
+
+def precompress(paths=None, workers=None):
+    """Compress files in parallel. Returns [(path, sizes)]."""
+    paths = site_files() if paths is None else list(paths)
+    if not brotli:
+        discard_variants(paths, (".br",))  # old .br copies would no longer match
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(compress_file, paths, chunksize=16))
+
+
+def print_sizes(results):
+    """Byte totals per artefact (a file, or a directory of shards) and variant."""
+    groups = {}
+    for path, sizes in results:
+        parts = path.replace(os.sep, "/").split("/")
+        name = parts[0] + "/" if len(parts) > 1 else parts[0]
+        group = groups.setdefault(name, {"files": 0})
+        group["files"] += 1
+        for ext, size in sizes.items():
+            group[ext] = group.get(ext, 0) + size
+
+    def kb(n):
+        return f"{n / 1024:,.1f} KB" if n is not None else "-"
+
+    print(f"  {'Artefact':<18}{'Files':>7}{'JSON':>14}{'gzip':>14}{'brotli':>14}")
+    totals = {}
+    for name, group in groups.items():
+        print(f"  {name:<18}{group['files']:>7,}{kb(group['']):>14}{kb(group.get('.gz')):>14}{kb(group.get('.br')):>14}")
+        for ext in ("",) + VARIANTS:
+            if ext in group:
+                totals[ext] = totals.get(ext, 0) + group[ext]
+    print(f"  {'Total':<18}{len(results):>7,}{kb(totals.get('', 0)):>14}"
+          f"{kb(totals.get('.gz')):>14}{kb(totals.get('.br')):>14}")
+    if brotli is None:
+        print("  (brotli not installed: pip install brotli for .br copies)")
+
+
+if __name__ == "__main__":
+    print_sizes(precompress())
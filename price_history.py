@@ -0,0 +1,119 @@
+"""
+Price History Store
+===================
+Records each listing's price on every publish, so the site can show real
+priceHistory for CarGurus listings. A point is added only when the price
+differs from the last one recorded, so a listing whose price never moves
+costs a single point however many crawls see it.
+
+Each series is a flat, delta-encoded list of ints:
+
+    [day0, price0, day1 - day0, price1 - price0, ...]
+
+where days count from 1970-01-01 (UTC). New points go to an append-only
+JSONL log of [id, day, price] lines, the same scheme ListingLog uses. Once
+the log outgrows the series count, it is folded into price_history.json.
+A second change on the same day replaces that day's point.
+"""
+
+import datetime
+import json
+import os
+import time
+
+HISTORY_FILE = "price_history.json"
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def today():
+    return int(time.time() // 86400)
+
+
+def day_to_date(day):
+    return (EPOCH + datetime.timedelta(days=day)).isoformat()
+
+
+class PriceHistory:
+    """Delta-encoded (day, price) series per listing id, with an append-only change log."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.log_file = os.path.splitext(path)[0] + "_log.jsonl"
+        self.series = {}
+        self._last = {}  # id -> (day, price) of the newest point
+        self._buffer = []
+        self._log_lines = 0
+
+    def load(self):
+        """Read the compacted series and replay the change log. Returns the number of series."""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.series = json.load(f)
+            except (OSError, ValueError):
+                self.series = {}
+        for lid, series in self.series.items():
+            self._last[lid] = (sum(series[0::2]), sum(series[1::2]))
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        lid, day, price = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-write
+                    self._add(lid, day, price)
+                    self._log_lines += 1
+        return len(self.series)
+
+    def _add(self, lid, day, price):
+        last = self._last.get(lid)
+        if last is None:
+            self.series[lid] = [day, price]
+        elif last[0] == day:
+            self.series[lid][-1] += price - last[1]
+        else:
+            self.series[lid].extend((day - last[0], price - last[1]))
+        self._last[lid] = (day, price)
+
+    def record(self, lid, price, day=None):
+        """Add a point if the price changed. Returns True if it did."""
+        if not price:
+            return False
+        lid, price = str(lid), int(round(price))
+        last = self._last.get(lid)
+        if last is not None and last[1] == price:
+            return False
+        day = today() if day is None else day
+        self._add(lid, day, price)
+        self._buffer.append((lid, day, price))
+        return True
+
+    def history(self, lid):
+        """[{"date": "2025-01-31", "price": 23995}, ...] oldest first."""
+        series = self.series.get(str(lid), ())
+        points = []
+        day = price = 0
+        for i in range(0, len(series), 2):
+            day += series[i]
+            price += series[i + 1]
+            points.append({"date": day_to_date(day), "price": price})
+        return points
+
+    def save(self):
+        """Append new points to the log, folding it into the series file once it grows large."""
+        if self._buffer:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(point) + "\n" for point in self._buffer))
+            self._log_lines += len(self._buffer)
+            self._buffer = []
+        if self._log_lines > len(self.series):
+            self.compact()
+
+    def compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.series, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self._log_lines = 0
@@ -0,0 +1,158 @@
+"""
+Query Planner
+=============
+Builds one request plan from every strategy's parameter sets before any
+network I/O:
+
+1. Canonicalise: numeric filter strings become numbers, offset 0 is dropped.
+2. Deduplicate: a query already planned by an earlier strategy is not
+   planned again.
+3. Order: strategies (and the queries within each) are sorted by expected
+   yield, estimated from how much of the filter space a query spans and
+   capped at the server's result cap. Broad queries go first. They find
+   the most listings, and an uncapped broad answer lets narrower queries
+   be skipped.
+
+While the plan runs, record() notes which queries came back below the
+result cap. Such an answer holds every matching listing. covered() then
+skips any later query whose filters lie inside an uncapped one. Sort
+order, offset and page size do not matter in that case.
+"""
+
+from slicer import RESULT_CAP
+
+INVENTORY_ESTIMATE = 47000  # listings reachable from the default zip/radius
+
+# (min key, max key, typical span) of each range filter
+RANGES = [
+    ("minPrice", "maxPrice", 100000),
+    ("startYear", "endYear", 26),
+    ("minMileage", "maxMileage", 200000),
+]
+RANGE_KEYS = {key for lo, hi, _ in RANGES for key in (lo, hi)}
+# Params that only change which part of a result set comes back
+PRESENTATION_KEYS = {"sortType", "offset", "maxResults"}
+# Rough share of the inventory matched by a single value of these filters
+CATEGORY_SHARE = {"makeId": 1 / 15, "bodyTypeGroupId": 1 / 5}
+DEFAULT_DISTANCE = 500
+NUMERIC_KEYS = RANGE_KEYS | {"offset", "distance", "maxResults"}
+
+
+def canonical(params):
+    """Params with numeric filter strings as numbers and offset 0 removed."""
+    out = {}
+    for key, value in params.items():
+        if key in NUMERIC_KEYS and isinstance(value, str) and value.lstrip("-").isdigit():
+            value = int(value)
+        out[key] = value
+    if not out.get("offset"):
+        out.pop("offset", None)
+    return out
+
+
+def plan_key(params):
+    return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+def _bounds(params, lo_key, hi_key):
+    return params.get(lo_key, float("-inf")), params.get(hi_key, float("inf"))
+
+
+def expected_yield(params, cap=RESULT_CAP, inventory=INVENTORY_ESTIMATE):
+    """Rough number of listings a query returns: its share of the inventory, capped."""
+    share = min(1.0, params.get("distance", DEFAULT_DISTANCE) / DEFAULT_DISTANCE)
+    for key, factor in CATEGORY_SHARE.items():
+        if key in params:
+            share *= factor
+    for lo_key, hi_key, span in RANGES:
+        lo, hi = _bounds(params, lo_key, hi_key)
+        if lo_key == "startYear":
+            hi += 1  # year ranges are inclusive
+        share *= min(1.0, max(0.0, hi - lo) / span)
+    estimate = share * inventory
+    if params.get("offset"):
+        estimate = max(0.0, estimate - params["offset"])
+    return min(cap, estimate)
+
+
+class PlanStep:
+    """One strategy's share of the plan."""
+
+    __slots__ = ("name", "params", "submitted", "duplicates", "expected")
+
+    def __init__(self, name, params, submitted, duplicates, expected):
+        self.name = name
+        self.params = params
+        self.submitted = submitted
+        self.duplicates = duplicates
+        self.expected = expected
+
+
+class QueryPlanner:
+    """Deduplicated, yield-ordered plan across strategies, plus runtime coverage pruning."""
+
+    def __init__(self, cap=RESULT_CAP):
+        self.cap = cap
+        self.skipped = 0
+        self._strategies = []
+        self._uncapped = {}  # zip -> list of uncapped queries from that zip
+
+    def add(self, name, param_sets):
+        self._strategies.append((name, [canonical(p) for p in param_sets]))
+
+    def build(self):
+        """Order strategies by expected yield per request and drop duplicate queries."""
+        def mean_yield(entry):
+            params = entry[1]
+            return sum(map(expected_yield, params)) / max(len(params), 1)
+
+        seen = set()
+        plan = []
+        for name, param_sets in sorted(self._strategies, key=mean_yield, reverse=True):
+            unique = []
+            for params in param_sets:
+                key = plan_key(params)
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(params)
+            unique.sort(key=expected_yield, reverse=True)
+            plan.append(PlanStep(name, unique, len(param_sets), len(param_sets) - len(unique),
+                                 sum(map(expected_yield, unique))))
+        return plan
+
+    def record(self, params, result_count):
+        """Remember queries whose answer was complete (below the result cap)."""
+        if result_count < self.cap and not params.get("offset"):
+            self._uncapped.setdefault(params.get("zip"), []).append(params)
+
+    def _contains(self, outer, inner):
+        if outer.get("distance", DEFAULT_DISTANCE) < inner.get("distance", DEFAULT_DISTANCE):
+            return False
+        for key, value in outer.items():
+            if key in RANGE_KEYS or key in PRESENTATION_KEYS or key == "distance":
+                continue
+            if inner.get(key) != value:
+                return False
+        for lo_key, hi_key, _ in RANGES:
+            outer_lo, outer_hi = _bounds(outer, lo_key, hi_key)
+            inner_lo, inner_hi = _bounds(inner, lo_key, hi_key)
+            if inner_lo < outer_lo or inner_hi > outer_hi:
+                return False
+        return True
+
+    def covered(self, params):
+        """True if an earlier uncapped answer already contains every result of params."""
+        for outer in self._uncapped.get(params.get("zip"), ()):
+            if self._contains(outer, params):
+                self.skipped += 1
+                return True
+        return False
+
+
+def print_plan(plan):
+    total = sum(len(step.params) for step in plan)
+    print(f"  {'#':>2}  {'Strategy':<32}{'Requests':>9}{'Dupes':>8}{'Exp. yield':>12}")
+    for i, step in enumerate(plan, 1):
+        print(f"  {i:>2}  {step.name:<32}{len(step.params):>9,}{step.duplicates:>8,}{step.expected:>12,.0f}")
+    print(f"  Total: {total:,} requests "
+          f"({sum(step.duplicates for step in plan):,} duplicates removed)")
@@ -0,0 +1,85 @@
+"""
+Adaptive Rate Limiter
+=====================
+Token bucket shared by every worker thread. The refill rate follows AIMD:
+it creeps up while responses are clean and is cut multiplicatively on a
+429/403, pausing for Retry-After when the server sends one.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+DEFAULT_PENALTY = 5.0  # pause (s) after a 429/403 without Retry-After
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds, or None if absent/unparseable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket with additive-increase / multiplicative-decrease."""
+
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=20.0, increase=1.0,
+                 decrease=0.5, burst=None, penalty=DEFAULT_PENALTY):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase  # req/s gained per second of clean traffic
+        self.decrease = decrease
+        self.burst = burst or max(1.0, rate)
+        self.penalty = penalty
+        self.throttle_count = 0
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        """Additive increase: roughly +increase req/s per second of clean responses."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self.burst = max(self.burst, self.rate)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease and a pause after a 429/403."""
+        with self._lock:
+            now = time.monotonic()
+            self.throttle_count += 1
+            # A burst of in-flight requests all rejected together counts as one signal
+            if now - self._last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            self._tokens = 0.0
+            pause = retry_after if retry_after is not None else self.penalty
+            self._blocked_until = max(self._blocked_until, now + pause)
+            self._last = max(self._last, self._blocked_until)
@@ -14,6 +14,8 @@ import random
 import re
 import sys
 
+from valuation import score_listings
+
 # Fix encoding issues on Windows
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
@@ -103,7 +105,7 @@ def extract_car_data(car_element, index):
             "bodyType": "Sedan",
             "imageUrl": image_url,
             "dealRating": deal_rating if deal_rating in ["Great Deal", "Good Deal", "Fair Deal"] else "No Price Analysis",
-            "dealScore": random.randint(60, 100),
+            "dealScore": None,  # filled in by score_listings
             "dealer": {
                 "name": dealer_name,
                 "rating": round(random.uniform(4.0, 5.0), 1),
@@ -242,6 +244,9 @@ def main():
     listings = scrape_cargurus_real(zip_code="77479", max_results=1000)
     
     if listings:
+        # Fair value and deal score for every listing, against the rest of the page
+        score_listings(listings)
+        
         # Save to JSON
         output_file = "cars.json"
         with open(output_file, "w", encoding="utf-8") as f:
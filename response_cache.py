@@ -0,0 +1,117 @@
+"""
+Response Cache
+==============
+On-disk cache in front of the fetch functions, so re-runs and resumed
+crawls are served from disk instead of re-issuing identical queries.
+Entries are keyed by endpoint plus the canonically sorted query params,
+expire after a TTL and are evicted least-recently-used once the cache
+exceeds its size bound. Only successful fetches are cached; a FetchError
+passes straight through.
+
+Run a scraper with --refresh to bypass cached entries (fresh responses
+still replace them).
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+CACHE_FILE = "http_cache.db"
+CACHE_TTL = 6 * 3600  # seconds
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+REFRESH = "--refresh" in sys.argv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_used ON responses (used_at);
+"""
+
+
+def cache_key(endpoint, params):
+    """Endpoint plus params sorted by name, with values as they go on the wire."""
+    return endpoint + "?" + urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+
+class ResponseCache:
+    """SQLite-backed TTL + size-bounded LRU cache of decoded responses."""
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, bypass=REFRESH):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # timeout: sharded crawls share the cache file across processes
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Cached value for key, or None if absent, expired or bypassed."""
+        if self.bypass:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT fetched_at, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def put(self, key, value):
+        body = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, fetched_at, used_at, size, body) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(body), body),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        self.conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+        self._size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._size -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def wrap(self, fetch, endpoint):
+        """Put the cache in front of a fetch(session, params) function for one endpoint."""
+        def cached_fetch(session, params):
+            key = cache_key(endpoint, params)
+            value = self.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+            value = fetch(session, params)
+            with self._lock:
+                self.misses += 1
+            self.put(key, value)
+            return value
+        return cached_fetch
+
+    def close(self):
+        self.conn.close()
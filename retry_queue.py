@@ -0,0 +1,124 @@
+"""
+Retry Queue
+===========
+Failed requests are recorded as work items instead of being treated as
+empty results. Each item is retried with jittered exponential backoff; after
+MAX_ATTEMPTS it moves to a dead-letter list that is replayed at the end of
+the run and persisted so the next run can try it again.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+
+MAX_ATTEMPTS = 4
+BASE_DELAY = 1.0   # seconds before the first retry
+MAX_DELAY = 60.0
+
+
+class FetchError(Exception):
+    """A request failed (network error or non-200) and should be retried."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class RetryQueue:
+    """Backoff-scheduled retry items plus a persistent dead-letter list."""
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY,
+                 max_delay=MAX_DELAY, encode=None, decode=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # encode/decode map work items to and from JSON for persistence
+        self.encode = encode or (lambda item: item)
+        self.decode = decode or (lambda data: data)
+        self.dead_letters = []
+        self.retried = 0
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempts):
+        """Full-jitter exponential backoff for the given attempt number."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def record(self, item, error, attempts=0):
+        """Schedule a failed item for retry, or dead-letter it once attempts run out."""
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.dead_letters.append({"item": item, "attempts": attempts, "error": str(error)})
+            return
+        due = time.monotonic() + self.backoff(attempts)
+        heapq.heappush(self._heap, (due, next(self._seq), item, attempts))
+
+    def wait_time(self):
+        """Seconds until the next item is due (0 if one is ready)."""
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def ready(self, limit=None):
+        """Pop items whose backoff has elapsed, as (item, attempts) pairs."""
+        now = time.monotonic()
+        items = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(items) < limit):
+            _, _, item, attempts = heapq.heappop(self._heap)
+            items.append((item, attempts))
+        self.retried += len(items)
+        return items
+
+    def drain(self, call):
+        """Retry queued items sequentially, yielding (item, result) for successes."""
+        while self._heap:
+            time.sleep(self.wait_time())
+            for item, attempts in self.ready():
+                try:
+                    yield item, call(item)
+                except FetchError as e:
+                    self.record(item, e, attempts)
+
+    def requeue_dead_letters(self):
+        """Move dead letters back onto the queue for a final replay pass."""
+        dead, self.dead_letters = self.dead_letters, []
+        for entry in dead:
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), entry["item"], 0))
+        return len(dead)
+
+    def export(self):
+        """The dead-letter list in JSON-serialisable form."""
+        return [{**entry, "item": self.encode(entry["item"])} for entry in self.dead_letters]
+
+    def restore(self, entries):
+        """Replace the dead-letter list with entries produced by export()."""
+        self.dead_letters = [{**entry, "item": self.decode(entry["item"])} for entry in entries]
+
+    def load(self, path):
+        """Queue dead letters persisted by a previous run."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        for entry in entries:
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), self.decode(entry["item"]), 0))
+        return len(entries)
+
+    def save(self, path):
+        """Persist the dead-letter list (removing the file when it is empty)."""
+        if not self.dead_letters:
+            if os.path.exists(path):
+                os.remove(path)
+            return 0
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.export(), f, indent=2)
+        return len(self.dead_letters)
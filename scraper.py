@@ -8,6 +8,8 @@ import json
 import time
 import random
 
+from valuation import score_listings
+
 
 def scrape_cargurus_listings(zip_code="77479", max_results=1000):
     """
@@ -56,7 +58,6 @@ def generate_sample_listings(count=1000):
     transmissions = ["Automatic", "CVT", "Manual", "Dual-Clutch"]
     fuel_types = ["Gasoline", "Diesel", "Hybrid", "Electric", "Plug-in Hybrid"]
     drive_trains = ["FWD", "RWD", "AWD", "4WD"]
-    deal_ratings = ["Great Deal", "Good Deal", "Fair Deal", "No Price Analysis"]
     
     dealers = [
         {"name": "AutoNation Toyota", "rating": 4.5, "reviews": 342},
@@ -203,8 +204,8 @@ def generate_sample_listings(count=1000):
             "drivetrain": random.choice(drive_trains),
             "bodyType": body_type,
             "imageUrl": image_url,
-            "dealRating": random.choice(deal_ratings),
-            "dealScore": random.randint(60, 100) if random.random() > 0.2 else None,
+            "dealRating": "No Price Analysis",
+            "dealScore": None,
             "dealer": {
                 "name": dealer["name"],
                 "rating": dealer["rating"],
@@ -243,6 +244,8 @@ def generate_sample_listings(count=1000):
         
         listings.append(listing)
     
+    # Deal ratings from each car's price against similar ones in the sample
+    score_listings(listings, override=True)
     return listings
 
 
@@ -0,0 +1,53 @@
+"""
+Sharded Crawl
+=============
+Partitions a crawl's filter space (e.g. the makes list) across N worker
+processes. Assignment depends only on the key and N, so a shard always
+gets the same keys and can be rerun on its own after a failure. Each
+worker writes its own shard file; merge_shards dedupes the completed
+shards by id into the final output.
+
+A shard is complete once its output file exists and its checkpoint log
+has been compacted away (see listing_log).
+"""
+
+import os
+import zlib
+
+from listing_log import ListingLog, log_path
+
+
+def shard_of(key, shard_count):
+    """Stable shard index for a key (independent of PYTHONHASHSEED)."""
+    return zlib.crc32(str(key).encode('utf-8')) % shard_count
+
+
+def partition(keys, shard_count):
+    """Split keys into shard_count lists, preserving their order."""
+    shards = [[] for _ in range(shard_count)]
+    for key in keys:
+        shards[shard_of(key, shard_count)].append(key)
+    return shards
+
+
+def shard_path(path, index, shard_count):
+    """cars.json -> cars.shard-2-of-4.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{index + 1}-of-{shard_count}{ext}"
+
+
+def shard_complete(path):
+    return os.path.exists(path) and not os.path.exists(log_path(path))
+
+
+def merge_shards(output_file, shard_files, remove=True):
+    """Merge completed shard files (plus the existing output) into output_file, deduped by id."""
+    out = ListingLog(output_file)
+    merged = out.load()
+    for path in shard_files:
+        merged.update(ListingLog(path).load())
+    count = out.compact(merged)
+    if remove:
+        for path in shard_files:
+            os.remove(path)
+    return count
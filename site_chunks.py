@@ -0,0 +1,106 @@
+"""
+Chunked Site Data
+=================
+Splits the normalized listings into fixed-size JSON chunks so the browse
+page can render its first screen after one small fetch and load the rest
+in the background. Chunks are in the page's default order: dealScore,
+highest first, with ties left in file order just as the stable sort in
+app.js leaves them. Each make also gets its own chunks, in the same order.
+
+data/manifest.json lists every chunk:
+
+    {"total": 46837, "chunkSize": 500, "sort": "dealScore",
+     "chunks": ["data/chunk-0000.json", ...],
+     "makes": {"Toyota": {"count": 5120, "chunks": ["data/make/toyota-0000.json", ...]}}}
+
+The directory is built next to the old one and swapped in once complete,
+so the site never sees a half-written set of chunks.
+
+Enable with --chunked on any scraper that publishes the site file. A
+publish without it removes the directory, since the browse page prefers
+the manifest over the site file and would otherwise show the old chunks.
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+CHUNKED = "--chunked" in sys.argv
+CHUNK_DIR = "data"
+CHUNK_SIZE = 500
+MANIFEST = "manifest.json"
+
+
+def slug(name):
+    """Mercedes-Benz -> mercedes-benz"""
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-") or "unknown"
+
+
+def default_order(cars):
+    return sorted(cars, key=lambda car: -(car.get("dealScore") or 0))
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write_chunks(cars, build_dir, out_dir, prefix, chunk_size):
+    """Write cars in chunk_size pieces; returns their site paths."""
+    paths = []
+    for n, start in enumerate(range(0, len(cars), chunk_size)):
+        name = f"{prefix}-{n:04d}.json"
+        _write_json(os.path.join(build_dir, name), cars[start:start + chunk_size])
+        paths.append(f"{out_dir}/{name}")
+    return paths
+
+
+def write_chunks(cars, out_dir=CHUNK_DIR, chunk_size=CHUNK_SIZE):
+    """Write the manifest and chunks for normalized cars. Returns the manifest."""
+    ordered = default_order(cars)
+    build_dir = out_dir + ".tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(os.path.join(build_dir, "make"))
+
+    by_make = {}
+    for car in ordered:
+        by_make.setdefault(car.get("make") or "Unknown", []).append(car)
+
+    manifest = {
+        "generatedAt": int(time.time()),
+        "total": len(ordered),
+        "chunkSize": chunk_size,
+        "sort": "dealScore",
+        "chunks": _write_chunks(ordered, build_dir, out_dir, "chunk", chunk_size),
+        "makes": {
+            make: {
+                "count": len(make_cars),
+                "chunks": _write_chunks(make_cars, build_dir, out_dir, f"make/{slug(make)}", chunk_size),
+            }
+            for make, make_cars in sorted(by_make.items())
+        },
+    }
+    _write_json(os.path.join(build_dir, MANIFEST), manifest)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(build_dir, out_dir)
+    return manifest
+
+
+def remove_chunks(out_dir=CHUNK_DIR):
+    """Remove a chunk set (and its compressed copies) left by an earlier chunked publish."""
+    # Only a directory write_chunks built; anything else under that name is left alone
+    if os.path.exists(os.path.join(out_dir, MANIFEST)):
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "cars.min.json"
+    with open(source, 'r', encoding='utf-8') as f:
+        site_cars = json.load(f)
+    written = write_chunks(site_cars)
+    print(f"Wrote {len(written['chunks'])} chunks ({written['total']} listings, "
+          f"{len(written['makes'])} makes) to {CHUNK_DIR}/")
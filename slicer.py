@@ -0,0 +1,108 @@
+"""
+Adaptive Range Slicer
+=====================
+searchResults.action returns at most RESULT_CAP listings per query, so the
+inventory has to be cut into slices small enough to come back uncapped.
+Instead of a fixed make x year x price grid, the planner starts from one
+wide slice per make and only bisects a slice that comes back at the cap,
+cycling through price, year and mileage. Slices that return fewer results
+than the cap are complete and pruned.
+"""
+
+RESULT_CAP = 48
+
+# Inclusive bounds of each splittable dimension, in split order
+DIMENSIONS = [
+    ("price", "minPrice", "maxPrice", (0, 1000000), 250),
+    ("year", "startYear", "endYear", (1980, 2026), 1),
+    ("mileage", "minMileage", "maxMileage", (0, 500000), 1000),
+]
+
+
+class Slice:
+    """A box in (make, price, year, mileage) space."""
+
+    __slots__ = ("make", "ranges", "depth")
+
+    def __init__(self, make, ranges=None, depth=0):
+        self.make = make
+        self.ranges = ranges or {name: bounds for name, _, _, bounds, _ in DIMENSIONS}
+        self.depth = depth
+
+    def params(self, base_params):
+        """Query params; a dimension is only filtered once it has been narrowed."""
+        params = dict(base_params)
+        if self.make:
+            params["makeId"] = self.make
+        for name, lo_key, hi_key, bounds, _ in DIMENSIONS:
+            lo, hi = self.ranges[name]
+            if (lo, hi) != bounds:
+                params[lo_key] = lo
+                params[hi_key] = hi
+        return params
+
+    def split(self):
+        """Bisect the next splittable dimension, or return None if none is left."""
+        for i in range(len(DIMENSIONS)):
+            name, _, _, _, min_width = DIMENSIONS[(self.depth + i) % len(DIMENSIONS)]
+            lo, hi = self.ranges[name]
+            if hi - lo + 1 <= min_width:
+                continue
+            mid = (lo + hi) // 2
+            return [
+                Slice(self.make, {**self.ranges, name: (lo, mid)}, self.depth + 1),
+                Slice(self.make, {**self.ranges, name: (mid + 1, hi)}, self.depth + 1),
+            ]
+        return None
+
+    def to_dict(self):
+        return {"make": self.make, "ranges": {k: list(v) for k, v in self.ranges.items()}, "depth": self.depth}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["make"], {k: tuple(v) for k, v in data["ranges"].items()}, data.get("depth", 0))
+
+    def describe(self):
+        parts = [self.make or "any make"]
+        for name, _, _, bounds, _ in DIMENSIONS:
+            if self.ranges[name] != bounds:
+                parts.append(f"{name} {self.ranges[name][0]}-{self.ranges[name][1]}")
+        return ", ".join(parts)
+
+
+class SlicePlanner:
+    """Breadth-first frontier of slices still to be fetched."""
+
+    def __init__(self, makes, cap=RESULT_CAP):
+        self.cap = cap
+        self.pending = [Slice(make) for make in makes]
+        self.requests = 0
+        self.split_count = 0
+        self.unsplittable = []
+
+    def take(self):
+        """Return the current wave of slices to fetch."""
+        wave, self.pending = self.pending, []
+        return wave
+
+    def record(self, sl, result_count):
+        """Feed back a slice's result count; capped slices are bisected."""
+        self.requests += 1
+        if result_count < self.cap:
+            return
+        children = sl.split()
+        if children is None:
+            self.unsplittable.append(sl)
+        else:
+            self.split_count += 1
+            self.pending.extend(children)
+
+    def report(self):
+        return {
+            "requests": self.requests,
+            "splits": self.split_count,
+            "unsplittable": [
+                {"slice": sl.describe(), "makeId": sl.make, **{k: list(v) for k, v in sl.ranges.items()}}
+                for sl in self.unsplittable
+            ],
+        }
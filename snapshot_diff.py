@@ -0,0 +1,114 @@
+"""
+Snapshot Diff
+=============
+Compares each published crawl with the previous one and writes a change
+feed for the site:
+
+    changes.json  {"generatedAt": 1760000000, "previousAt": 1759900000,
+                   "new": [id, ...], "removed": [id, ...],
+                   "repriced": [[id, oldPrice, newPrice], ...]}
+
+A snapshot is the [id, price, lastSeen] entries of a crawl, sorted by id
+(the listing_docs order). Diffing two snapshots is a single merge pass
+over both sorted lists. The current snapshot replaces the previous one
+once the feed is written. The first publish only records a baseline, and
+its feed is empty.
+
+The scrapers publish their whole accumulated inventory, so a listing that
+was sold never leaves it. They also pass the ids their crawl actually
+returned; lastSeen (days since 1970-01-01) is updated for those, and a
+listing no crawl has returned for GONE_AFTER_DAYS drops out of the
+snapshot and is reported as removed. The grace period keeps a partial or
+resumed crawl from reporting everything it missed. Without seen ids, every
+listing counts as seen.
+"""
+
+import json
+import os
+import time
+
+from listing_docs import id_order
+from price_history import today
+
+SNAPSHOT_FILE = "snapshot.json"
+CHANGES_FILE = "changes.json"
+GONE_AFTER_DAYS = 2
+
+
+def take_snapshot(cars, seen=None, previous=(), day=None):
+    """[[id, price, lastSeen], ...] sorted by id, without listings unseen for GONE_AFTER_DAYS."""
+    day = today() if day is None else day
+    # Snapshots from before lastSeen was kept count as seen today
+    last_seen = {entry[0]: entry[2] for entry in previous if len(entry) > 2}
+    snapshot = []
+    for car in cars:
+        lid = car.get("id")
+        if not lid:
+            continue
+        seen_day = day if seen is None or lid in seen else last_seen.get(lid, day)
+        if day - seen_day < GONE_AFTER_DAYS:
+            snapshot.append([lid, car.get("price") or 0, seen_day])
+    return sorted(snapshot, key=lambda entry: id_order(entry[0]))
+
+
+def diff_snapshots(previous, current):
+    """Merge two sorted snapshots. Returns (new ids, removed ids, [[id, old, new]])."""
+    new, removed, repriced = [], [], []
+    i = j = 0
+    while i < len(previous) and j < len(current):
+        old_id, old_price = previous[i][:2]
+        cur_id, cur_price = current[j][:2]
+        old_key, cur_key = id_order(old_id), id_order(cur_id)
+        if old_key == cur_key:
+            if old_price != cur_price:
+                repriced.append([cur_id, old_price, cur_price])
+            i += 1
+            j += 1
+        elif old_key < cur_key:
+            removed.append(old_id)
+            i += 1
+        else:
+            new.append(cur_id)
+            j += 1
+    removed.extend(entry[0] for entry in previous[i:])
+    new.extend(entry[0] for entry in current[j:])
+    return new, removed, repriced
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def write_changes(cars, seen=None, snapshot_file=SNAPSHOT_FILE, changes_file=CHANGES_FILE):
+    """
+    Diff cars against the last snapshot, write the feed and the new snapshot.
+    seen holds the ids this crawl returned (None: all of them). Returns the feed.
+    """
+    previous = _read_json(snapshot_file)
+    current = take_snapshot(cars, seen, previous["listings"] if previous else ())
+    now = int(time.time())
+    if previous is None:
+        new, removed, repriced = [], [], []
+    else:
+        new, removed, repriced = diff_snapshots(previous["listings"], current)
+    changes = {
+        "generatedAt": now,
+        "previousAt": previous["takenAt"] if previous else None,
+        "new": new,
+        "removed": removed,
+        "repriced": repriced,
+    }
+    _write_json(changes_file, changes)
+    _write_json(snapshot_file, {"takenAt": now, "listings": current})
+    return changes
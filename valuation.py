@@ -0,0 +1,165 @@
+"""
+Fair Market Value
+=================
+Estimates what each listing should cost from the rest of the inventory,
+and scores its asking price against that estimate. There are no extra
+requests; a full 50k-listing inventory scores in well under a second.
+
+The model is log(price) ~ year + mileage, fitted per make/model. Small
+groups borrow strength from the level above: a model's coefficients are
+ridge-shrunk toward its make's, and a make's toward the whole
+inventory's. Every group is fitted at once. The normal equations of all
+groups are built with bincount and solved as one stacked batch.
+
+The residual r = log(price / fairValue), divided by the make's residual
+spread, gives the deal score: 100 / (1 + exp(1.702 z)), a logistic
+stand-in for the normal CDF. 50 is a fair price and higher is cheaper.
+
+Listings get fairValue always. dealScore, dealRating and
+priceDifferential (fairValue - price, positive = below market) are only
+filled where the source left them empty, unless --rescore is given.
+
+The model is refit over the whole inventory on every publish, so one new
+or repriced listing nudges every estimate a little. To keep unchanged
+listings byte-identical between publishes (so their documents are not
+rewritten and recompressed), fairValue is rounded to FAIR_VALUE_STEP, and
+a listing whose price did not change keeps its previous fairValue and
+score until the new ones move by more than the tolerances below.
+"""
+
+import sys
+
+import numpy as np
+
+RESCORE = "--rescore" in sys.argv
+RIDGE = 5.0  # pseudo-listings pulling a group's coefficients toward its parent
+MILEAGE_SCALE = 10000.0
+MIN_SPREAD = 0.02  # floor on a make's log-price spread, so a tiny inventory can't score +-inf
+FAIR_VALUE_STEP = 100  # dollars
+FAIR_VALUE_TOLERANCE = 0.02  # relative move before a kept fairValue is replaced
+SCORE_TOLERANCE = 5  # points
+# (minimum score, rating), best first; labels as formatDealRating in app.js shows them
+RATINGS = ((85, "Great Deal"), (70, "Good Deal"), (30, "Fair Deal"), (15, "High Price"), (0, "Overpriced"))
+
+
+def _design(years, mileages, dated):
+    """[1, centred year, centred mileage / 10k] per listing, centred on the listings with a year."""
+    x_year = years - years[dated].mean() if dated.any() else years
+    x_miles = (mileages - (mileages[dated].mean() if dated.any() else 0)) / MILEAGE_SCALE
+    return np.column_stack((np.ones_like(years), x_year, x_miles))
+
+
+def fit_groups(codes, X, y, groups, prior, ridge=RIDGE):
+    """
+    Ridge least squares per group, shrunk toward prior (groups x k):
+    (X'X + ridge I) b = X'y + ridge * prior, for all groups in one batch.
+    """
+    k = X.shape[1]
+    xtx = np.empty((groups, k, k))
+    xty = np.empty((groups, k))
+    for i in range(k):
+        xty[:, i] = np.bincount(codes, weights=X[:, i] * y, minlength=groups)
+        for j in range(i, k):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(codes, weights=X[:, i] * X[:, j], minlength=groups)
+    xtx += ridge * np.eye(k)
+    xty += ridge * prior
+    return np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+
+def fair_values(makes, models, years, mileages, prices):
+    """
+    Fair value and z-scored log residual for every listing (arrays). Listings
+    without a price get a fair value but a NaN z; without a year, both are NaN.
+    """
+    dated = years > 0
+    X = _design(years, mileages, dated)
+    usable = (prices > 0) & dated
+    y = np.log(np.where(usable, prices, 1.0))
+
+    make_names, make_codes = np.unique(makes, return_inverse=True)
+    _, model_names = np.unique(models, return_inverse=True)
+    # A model is a (make, model name) pair of codes
+    pairs, model_codes = np.unique(np.column_stack((make_codes, model_names)), axis=0, return_inverse=True)
+    model_codes = model_codes.reshape(-1)
+    model_make = pairs[:, 0]
+
+    Xu, yu = X[usable], y[usable]
+    # Whole inventory, shrunk toward a flat average price
+    flat = np.zeros((1, X.shape[1]))
+    flat[0, 0] = yu.mean() if yu.size else 0.0
+    overall = fit_groups(np.zeros(yu.size, dtype=int), Xu, yu, 1, flat)[0]
+    make_beta = fit_groups(make_codes[usable], Xu, yu, make_names.size,
+                           np.tile(overall, (make_names.size, 1)))
+    model_beta = fit_groups(model_codes[usable], Xu, yu, model_make.size, make_beta[model_make])
+
+    log_fair = np.einsum("ij,ij->i", X, model_beta[model_codes])
+    residual = np.where(usable, y - log_fair, np.nan)
+
+    # Residual spread per make, shrunk toward the overall spread the same way
+    ok = usable & np.isfinite(residual)
+    overall_var = np.mean(residual[ok] ** 2) if ok.any() else 1.0
+    sq = np.bincount(make_codes[ok], weights=residual[ok] ** 2, minlength=make_names.size)
+    n = np.bincount(make_codes[ok], minlength=make_names.size)
+    spread = np.maximum(np.sqrt((sq + RIDGE * overall_var) / (n + RIDGE)), MIN_SPREAD)
+    return np.where(dated, np.exp(log_fair), np.nan), residual / spread[make_codes]
+
+
+def deal_scores(z):
+    return np.rint(100.0 / (1.0 + np.exp(np.clip(1.702 * z, -50, 50))))
+
+
+def deal_rating(score):
+    for minimum, label in RATINGS:
+        if score >= minimum:
+            return label
+    return RATINGS[-1][1]
+
+
+def _stable(value, score, price, previous):
+    """The previous publish's (fairValue, score) if price is unchanged and neither moved past its tolerance."""
+    if not previous or previous.get("price") != price or not previous.get("fairValue"):
+        return value, score
+    old_value, old_score = previous["fairValue"], previous.get("dealScore")
+    if abs(value - old_value) > FAIR_VALUE_TOLERANCE * old_value:
+        return value, score
+    if score == score and old_score is not None and abs(score - old_score) <= SCORE_TOLERANCE:
+        score = old_score
+    return old_value, score
+
+
+def score_listings(cars, override=RESCORE, previous=None):
+    """
+    Add fairValue (and missing deal fields) to normalized listings in place.
+    previous maps id -> the listing as last published. Returns how many were scored.
+    """
+    cars = [car for car in cars if car.get("make")]
+    if not cars:
+        return 0
+    makes = np.array([str(car["make"]) for car in cars])
+    models = np.array([str(car.get("model") or "") for car in cars])
+    years = np.array([car.get("year") or 0 for car in cars], dtype=float)
+    mileages = np.array([car.get("mileage") or 0 for car in cars], dtype=float)
+    prices = np.array([car.get("price") or 0 for car in cars], dtype=float)
+    if not ((prices > 0) & (years > 0)).any():
+        return 0  # nothing to fit a price model to
+
+    fair, z = fair_values(makes, models, years, mileages, prices)
+    scores = deal_scores(z)
+    previous = previous or {}
+    scored = 0
+    for car, value, score, price in zip(cars, fair.tolist(), scores.tolist(), prices.tolist()):
+        if value != value:  # NaN: no year to price it by
+            continue
+        value = int(round(value / FAIR_VALUE_STEP)) * FAIR_VALUE_STEP
+        value, score = _stable(value, score, car.get("price"), previous.get(car.get("id")))
+        car["fairValue"] = value
+        if score != score:  # NaN: no price to score
+            continue
+        if override or not car.get("dealScore"):
+            car["dealScore"] = int(score)
+        if override or car.get("dealRating") in (None, "", "No Price Analysis"):
+            car["dealRating"] = deal_rating(score)
+        if override or not car.get("priceDifferential"):
+            car["priceDifferential"] = int(value - price)
+        scored += 1
+    return scored
@@ -0,0 +1,127 @@
+"""
+Lease-Based Work Queue
+======================
+A local SQLite database holding a crawl plan as work items, so any number
+of worker processes can cooperate on it. A worker leases items for
+LEASE_SECONDS, heartbeats while it works on them and marks them complete.
+If a worker dies, its leases expire and the items are handed to the next
+worker that asks, so a killed worker loses at most the items it held.
+
+Items are keyed by their canonical params; enqueueing the same plan twice
+is a no-op.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+
+QUEUE_FILE = "work_queue.db"
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    key TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_count INTEGER,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_state ON work_items (state, lease_expires);
+"""
+
+
+class LeaseLost(Exception):
+    """A heartbeat found the lease expired and handed to another worker."""
+
+
+def item_key(params):
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite-backed queue of param dicts with expiring leases."""
+
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # autocommit; writes that must be atomic use BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def enqueue(self, param_sets):
+        """Add work items, skipping ones already queued. Returns how many were new."""
+        now = time.time()
+        rows = [(item_key(p), json.dumps(p), now) for p in param_sets]
+        self.conn.execute("BEGIN IMMEDIATE")
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO work_items (key, params, updated_at) VALUES (?, ?, ?)", rows)
+        added = self.conn.total_changes - before
+        self.conn.execute("COMMIT")
+        return added
+
+    def lease(self, owner, limit=1):
+        """Lease up to limit pending (or expired) items. Returns [(key, params)]."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(
+                "SELECT key, params FROM work_items "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT ?", (now, limit)).fetchall()
+            self.conn.executemany(
+                "UPDATE work_items SET state = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                [(owner, now + self.lease_seconds, now, key) for key, _ in rows])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [(key, json.loads(params)) for key, params in rows]
+
+    def heartbeat(self, owner, key):
+        """Extend a lease. Returns False if the lease was lost (expired and re-leased)."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE work_items SET lease_expires = ?, updated_at = ? "
+            "WHERE key = ? AND owner = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, key, owner))
+        return cur.rowcount == 1
+
+    def complete(self, owner, key, result_count=None):
+        cur = self.conn.execute(
+            "UPDATE work_items SET state = 'done', result_count = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE key = ? AND owner = ?",
+            (result_count, time.time(), key, owner))
+        return cur.rowcount == 1
+
+    def fail(self, owner, key, error):
+        """Release a failed item for another attempt, or park it once attempts run out."""
+        self.conn.execute(
+            "UPDATE work_items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, lease_expires = NULL, error = ?, updated_at = ? WHERE key = ? AND owner = ?",
+            (self.max_attempts, str(error), time.time(), key, owner))
+
+    def outstanding(self):
+        """Items not yet done or failed (pending or leased)."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM work_items WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM work_items GROUP BY state").fetchall())
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,64 @@
+"""
+Marginal Yield Tracker
+======================
+Tracks how many listings each strategy finds per request over a sliding
+window. The caller decides what counts as found: listings new to the
+inventory, or, for a crawler that refreshes what it has, listings first
+seen this run or changed since they were stored. A strategy stops early
+when the window is full and its yield falls below the threshold, so the
+rest of the budget goes to the next strategy. The end-of-run report shows
+what each strategy spent and what it found.
+"""
+
+from collections import deque
+
+YIELD_WINDOW = 200  # requests
+MIN_YIELD = 0.05  # listings found per request
+
+
+class StrategyYield:
+    """Request and found-listing counts for one strategy."""
+
+    def __init__(self, name, window, min_yield):
+        self.name = name
+        self.min_yield = min_yield
+        self.requests = 0
+        self.found = 0
+        self.planned = 0
+        self.stopped_early = False
+        self._window = deque(maxlen=window)
+
+    @property
+    def window_yield(self):
+        return sum(self._window) / max(len(self._window), 1)
+
+    def record(self, found):
+        """Count one request. Returns False once the strategy should stop."""
+        self.requests += 1
+        self.found += found
+        self._window.append(found)
+        if len(self._window) == self._window.maxlen and self.window_yield < self.min_yield:
+            self.stopped_early = True
+            return False
+        return True
+
+
+class YieldTracker:
+    """Per-strategy yield tracking with a sliding-window stopping rule."""
+
+    def __init__(self, window=YIELD_WINDOW, min_yield=MIN_YIELD):
+        self.window = window
+        self.min_yield = min_yield
+        self.strategies = []
+
+    def start(self, name, planned=0):
+        strategy = StrategyYield(name, self.window, self.min_yield)
+        strategy.planned = planned
+        self.strategies.append(strategy)
+        return strategy
+
+    def print_report(self):
+        print(f"  {'Strategy':<34}{'Requests':>10}{'Found':>9}{'Found/req':>11}")
+        for s in self.strategies:
+            note = f"  stopped early ({s.planned - s.requests:,} skipped)" if s.stopped_early else ""
+            print(f"  {s.name:<34}{s.requests:>10,}{s.found:>9,}{s.found / max(s.requests, 1):>11.2f}{note}")